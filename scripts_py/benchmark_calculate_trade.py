@@ -0,0 +1,81 @@
+'''
+This script benchmarks the trade balance of the IAMC export (calculate_trade in scripts_smk/resultify.py)
+on synthetic OSeMBE-sized results and shows how its run time scales with the size of the results.
+
+The results hold the electricity trade technologies between neighbouring countries, named like the
+OSeMBE technologies, e.g. ATELDEBP00, with UseByTechnology by timeslice and ProductionByTechnologyAnnual
+by year. The number of countries and of timeslices is doubled for each step, with the OSeMBE
+resolution of 30 countries, 46 years and 12 timeslices in between.
+
+It needs the packages of resultify.py, e.g. the envs/openentrance_env.yaml environment.
+
+Usage:
+
+    python scripts_py/benchmark_calculate_trade.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmark_utils import best_time, table_header, table_row
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts_smk'))
+from resultify import calculate_trade
+
+repeats = 3
+trade_techs = ['(?=^.{2}(EL))^((?!00).)*$']  # as in config/iamc_config.yaml
+years = range(2015, 2061)
+sizes = [(8, 3), (15, 6), (30, 12), (60, 24), (120, 48)]  # countries, timeslices
+columns = [('countries', '>10'), ('timeslices', '>11'), ('rows', '>10'), ('trade rows', '>11'), ('time [s]', '>10.3f'),
+           ('us/row', '>8.3f')]
+
+
+def country_names(number):
+    '''
+    returns ``number`` two letter country codes
+    '''
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [a + b for a in letters for b in letters][:number]
+
+
+def make_results(countries, timeslices, seed=0):
+    '''
+    returns synthetic UseByTechnology and ProductionByTechnologyAnnual results with 4 neighbours
+    per country and trade technologies in both directions
+    '''
+    rng = np.random.default_rng(seed)
+    names = country_names(countries)
+    techs = [names[i] + 'EL' + names[(i + k) % countries] + 'BP01' for i in range(countries) for k in (1, 2, 3, 4)]
+    techs += [c + 'ELTDBP00' for c in names] + [c + 'NGCCPH00' for c in names]  # not traded
+
+    use = pd.DataFrame([(f'S{s}', t, t[:2] + 'E1', y) for t in techs for y in years for s in range(timeslices)],
+                       columns=['TIMESLICE', 'TECHNOLOGY', 'FUEL', 'YEAR'])
+    production = pd.DataFrame([(t, t[4:6] + 'E1', y) for t in techs for y in years],
+                              columns=['TECHNOLOGY', 'FUEL', 'YEAR'])
+    results = {}
+    for name, df in (('UseByTechnology', use), ('ProductionByTechnologyAnnual', production)):
+        df.insert(0, 'REGION', 'EU+CH+NO+UK')
+        df['VALUE'] = rng.lognormal(0, 2, len(df)) * (rng.random(len(df)) < 0.7)
+        results[name] = df
+    return results
+
+
+def time_trade(results):
+    '''
+    returns the best wall time of several trade balance calculations in seconds and the trade balance
+    '''
+    return best_time(lambda copies: calculate_trade(copies, trade_techs), repeats,
+                     prepare=lambda: ({name: df.copy() for name, df in results.items()},))
+
+
+if __name__ == '__main__':
+
+    print(table_header(columns))
+    for countries, timeslices in sizes:
+        results = make_results(countries, timeslices)
+        rows = sum(len(df) for df in results.values())
+        seconds, trade = time_trade(results)
+        print(table_row(columns, [countries, timeslices, rows, len(trade), seconds, seconds / rows * 1e6]))
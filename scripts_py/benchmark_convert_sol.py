@@ -0,0 +1,96 @@
+'''
+This script benchmarks the conversion of a gurobi solution file into the result csv files.
+It compares otoole.convert_results (scripts_smk/convert.py) with scripts_smk/convert_sol.py
+and checks that both write the same files, byte for byte.
+
+Results with a set used twice, e.g. Trade with REGION and _REGION, are always checked. otoole
+assigns the last of the duplicate sets to both columns, so its file only has to match the file of
+convert_sol.py with the first of the duplicate sets replaced by the last one.
+
+The solution file and the csv folder of a model run can be taken from the workflow, e.g.:
+
+    python scripts_py/benchmark_convert_sol.py config/otoole.yaml results/Nordic/model_0/model_0.sol results/Nordic/model_0/data
+
+Usage:
+
+    python scripts_py/benchmark_convert_sol.py <path_config> <path_gurobi.sol> <path_data>
+'''
+
+import os
+import sys
+import tempfile
+
+import otoole
+import pandas as pd
+from otoole.results.results import check_for_duplicates, rename_duplicate_column
+from otoole.utils import _read_file
+
+from benchmark_utils import best_time, differing_files, speed_up, table_header, table_row
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts_smk'))
+import convert_sol
+
+columns = [('otoole [s]', '>12.2f'), ('convert_sol [s]', '>16.2f'), ('speed-up', '>10'), ('files', '>6')]
+
+
+def duplicate_set_results(user_config):
+    '''
+    returns the names of the results with a set used twice, e.g. Trade
+    '''
+    return sorted(name for name, details in user_config.items()
+                  if details['type'] == 'result' and check_for_duplicates(details['indices']))
+
+
+def same_as_otoole(path_otoole, path_sol, indices):
+    '''
+    returns if a result with a set used twice matches the result of otoole, where the first of the
+    duplicate sets holds the values of the last one
+    '''
+    columns = rename_duplicate_column(indices)
+    last = [column for column, index in zip(columns, indices) if column != index][0]  # e.g. _REGION
+    df_otoole = pd.read_csv(path_otoole)
+    df_sol = pd.read_csv(path_sol)
+    df_sol[last[1:]] = df_sol[last]
+    return (df_otoole.sort_values(columns).reset_index(drop=True)
+            .equals(df_sol.sort_values(columns).reset_index(drop=True)))
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 4:
+        print("Usage: python scripts_py/benchmark_convert_sol.py <path_config> <path_gurobi.sol> <path_data>")
+        sys.exit(1)
+    path_config, path_sol, path_dp = sys.argv[1:]
+
+    _, ending = os.path.splitext(path_config)
+    with open(path_config, 'r') as f:
+        user_config = _read_file(f, ending)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder_otoole = os.path.join(tmpdir, 'otoole')
+        folder_sol = os.path.join(tmpdir, 'convert_sol')
+
+        time_otoole, _ = best_time(
+            lambda: otoole.convert_results(path_config, 'gurobi', 'csv', path_sol, folder_otoole, 'csv', path_dp), 1)
+        time_sol, _ = best_time(lambda: convert_sol.main(user_config, path_sol, folder_sol, path_dp), 1)
+
+        files = sorted(os.listdir(folder_otoole))
+        differing = differing_files(folder_otoole, folder_sol)
+
+        duplicates = [name for name in duplicate_set_results(user_config) if f'{name}.csv' in files]
+        for name in duplicates:
+            if f'{name}.csv' in differing and same_as_otoole(os.path.join(folder_otoole, f'{name}.csv'),
+                                                            os.path.join(folder_sol, f'{name}.csv'),
+                                                            user_config[name]['indices']):
+                differing.remove(f'{name}.csv')
+
+    print(table_header(columns))
+    print(table_row(columns, [time_otoole, time_sol, speed_up(time_otoole, time_sol), len(files)]))
+    if differing:
+        print(f"Result files differ: {differing}")
+        sys.exit(1)
+    print("All result files are identical")
+    if duplicates:
+        print(f"Results with a set used twice match otoole: {duplicates}")
+    else:
+        print(f"No values of the results with a set used twice: {duplicate_set_results(user_config)}")
@@ -0,0 +1,75 @@
+'''
+This script benchmarks the parameter patching of a model run (scripts_smk/gsa/create_modelrun.py).
+It compares the row by row update of the sampled values with the batched update per parameter
+and checks that both produce the same parameters.
+
+The sample files can be created with the create_sample and expand_sample rules, e.g. modelruns/Nordic/model_0/sample_0.txt.
+
+Usage:
+
+    python scripts_py/benchmark_create_modelrun.py <csv_directory> <user_config> <sample_file> [<sample_file> ...]
+'''
+
+import copy
+import csv
+import logging
+import os
+import sys
+
+from benchmark_utils import best_time, speed_up, table_header, table_row
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts_smk', 'gsa'))
+from create_modelrun import modify_parameters
+from otoole.read_strategies import ReadCsv
+from otoole.utils import _read_file
+
+repeats = 3
+columns = [('sample', '<40'), ('rows', '>6'), ('row by row [s]', '>15.3f'), ('batched [s]', '>12.3f'),
+           ('speed-up', '>10')]
+
+
+def time_modify(model_params, sample, user_config, batched):
+    '''
+    returns the best wall time of several parameter updates in seconds and the updated parameters
+    '''
+    return best_time(lambda params: modify_parameters(params, sample, user_config, batched=batched), repeats,
+                     prepare=lambda: (copy.deepcopy(model_params),))
+
+
+def same_parameters(left, right):
+    '''
+    checks that the values, row order and dtypes of all parameters are equal
+    '''
+    for name in left:
+        if not left[name].equals(right[name]) or not left[name].index.equals(right[name].index):
+            return False
+        if not (left[name].dtypes == right[name].dtypes).all():
+            return False
+    return True
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 4:
+        print("Usage: python scripts_py/benchmark_create_modelrun.py <csv_directory> <user_config> <sample_file> [<sample_file> ...]")
+        sys.exit(1)
+
+    _, ending = os.path.splitext(sys.argv[2])
+    with open(sys.argv[2], 'r') as f:
+        user_config = _read_file(f, ending)
+
+    model_params, _ = ReadCsv(user_config=user_config).read(sys.argv[1])
+    model_params = {name: parameter.sort_index() for name, parameter in model_params.items()}
+    logging.disable(logging.INFO)
+
+    print(table_header(columns))
+    for sample_file in sys.argv[3:]:
+        with open(sample_file, 'r') as csv_file:
+            sample = list(csv.DictReader(csv_file))
+        time_rows, params_rows = time_modify(model_params, sample, user_config, batched=False)
+        time_batched, params_batched = time_modify(model_params, sample, user_config, batched=True)
+        if not same_parameters(params_rows, params_batched):
+            print(f"Parameters differ for {sample_file}")
+            sys.exit(1)
+        print(table_row(columns, [os.path.basename(sample_file), len(sample), time_rows, time_batched,
+                                  speed_up(time_rows, time_batched)]))
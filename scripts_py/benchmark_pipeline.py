@@ -0,0 +1,253 @@
+'''
+This script benchmarks the stages of the workflow on the bundled data packages (input_data/Nordic* by default).
+
+For every data package the stages of a model run are run one after the other, like the snakemake rules:
+convert_dp (otoole), pre_process, generate_lp (glpsol), solve (gurobi_cl), process_solution (otoole),
+calc_result_variables and extract_results (all entries of config/results.csv). The SA analysis
+(calculate_SA_results.py on the objective) is benchmarked once on a morris sample of config/parameters.csv
+with random objective values, as it doesn't depend on the data package.
+
+The wall time in seconds (s) and peak memory in MB (max_rss, unix only) of every stage are written to
+benchmarks/pipeline/<label>.tsv, with the same column names as the snakemake benchmark files, and to
+benchmarks/pipeline/<label>.json together with the commit, model file and data package sizes. Stages after
+a failed stage of a data package are skipped.
+
+Two benchmark runs can be compared to catch slowdowns, e.g. after the model file or the data has grown.
+Stages that got slower or use more memory than the tolerance (default 1.2, i.e. 20 %) are listed and the
+script exits with 1:
+
+    python scripts_py/benchmark_pipeline.py run [<label>] [<data package> ...]
+    python scripts_py/benchmark_pipeline.py compare <baseline.json> <current.json> [<tolerance>]
+'''
+
+import csv
+import datetime
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmark_utils import table_header, table_row
+from run_parallel import run_stage
+
+root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+benchmark_folder = os.path.join(root, 'benchmarks', 'pipeline')
+work_folder = os.path.join(root, 'temp', 'benchmark_pipeline')
+
+model_file = os.path.join(root, 'model', 'osemosys.txt')
+otoole_config = os.path.join(root, 'config', 'otoole.yaml')
+parameters_file = os.path.join(root, 'config', 'parameters.csv')
+results_file = os.path.join(root, 'config', 'results.csv')
+
+STAGES = ['convert_dp', 'pre_process', 'generate_lp', 'solve', 'process_solution',
+          'calc_result_variables', 'extract_results']
+
+sa_replicates = 10
+solver_threads = 4
+
+compare_columns = [('package', '<32'), ('stage', '<22'), ('s before', '>10.2f'), ('s after', '>10.2f'), ('ratio', '>7.2f'),
+                   ('MB before', '>10'), ('MB after', '>10'), ('ratio', '>7.2f')]
+
+
+def script(*path):
+    return os.path.join(root, 'scripts_smk', *path)
+
+
+def get_commands(package, dp_path):
+    '''
+    returns the commands of every stage of a data package, run from the work folder
+    '''
+    # extract_results expects results/{scenario}/{model_run}/results/{parameter}.csv
+    res_folder = f'results/{package}/model_0/results'
+    commands = {
+        'convert_dp': [['otoole', 'convert', 'csv', 'datafile', dp_path, f'{package}.txt', otoole_config]],
+        'pre_process': [[sys.executable, script('pre_process.py'), 'otoole', f'{package}.txt', f'{package}.pre']],
+        'generate_lp': [['glpsol', '-m', model_file, '-d', f'{package}.pre', '--wlp', f'{package}.lp', '--check']],
+        'solve': [['gurobi_cl', f'Threads={solver_threads}', f'ResultFile={package}.sol', f'{package}.lp']],
+        'process_solution': [[sys.executable, script('convert.py'), otoole_config, f'{package}.sol', res_folder, dp_path]],
+        'calc_result_variables': [[sys.executable, script('calc_result_variables.py'), res_folder]],
+        'extract_results': [],
+    }
+    with open(results_file, 'r') as f:
+        for row in csv.DictReader(f):
+            commands['extract_results'].append(
+                [sys.executable, script('gsa', 'extract_results.py'), f"{res_folder}/{row['resultfile']}.csv",
+                 otoole_config, f"results/{package}/{row['filename']}.csv", results_file])
+    return commands
+
+
+def get_sa_commands():
+    '''
+    returns the commands of the SA analysis on a morris sample with random objective values
+    '''
+    return {
+        'create_sample': [[sys.executable, script('gsa', 'create_sample.py'), parameters_file, 'morris_sample.txt',
+                           str(sa_replicates)]],
+        'calculate_SA': [[sys.executable, script('gsa', 'calculate_SA_results.py'), parameters_file, 'morris_sample.txt',
+                          'objective.csv', 'SA/SA_objective.csv', 'objective', 'False']],
+    }
+
+
+def write_objective(folder):
+    '''
+    writes random objective values for the rows of the morris sample
+    '''
+    runs = len(np.loadtxt(os.path.join(folder, 'morris_sample.txt'), delimiter=',', ndmin=2))
+    rng = np.random.default_rng(42)
+    with open(os.path.join(folder, 'objective.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['FILE', 'OBJECTIVE'])
+        for run, value in enumerate(rng.uniform(1e5, 2e5, runs)):
+            writer.writerow([f'model_{run}', value])
+
+
+def run_commands(package, stage, commands, folder, log_folder):
+    '''
+    runs the commands of a stage and returns a benchmark row with the summed wall time and the largest peak memory
+    '''
+    log_path = os.path.join(log_folder, f'{package}_{stage}.log')
+    wall_time = 0
+    peak_rss = []
+    returncode = 0
+    for number, command in enumerate(commands):
+        returncode, seconds, rss = run_stage(command, log_path if number == 0 else f'{log_path}.{number}', cwd=folder)
+        wall_time += seconds
+        if rss is not None:
+            peak_rss.append(rss)
+        if returncode != 0:
+            break
+    print(f'{package}: {stage} done in {wall_time:.1f} s' if returncode == 0
+          else f'{package}: {stage} failed with exit code {returncode}, see {log_path}')
+    return {'package': package, 'stage': stage, 'returncode': returncode, 's': round(wall_time, 3),
+            'max_rss': round(max(peak_rss), 1) if peak_rss else 'NA'}
+
+
+def run_stages(package, stages, folder, log_folder, before=None):
+    '''
+    runs the stages of a package one after the other, the stages after a failure are skipped
+    '''
+    rows = []
+    failed = False
+    for stage, commands in stages.items():
+        if failed:
+            rows.append({'package': package, 'stage': stage, 'returncode': 'skipped', 's': 'NA', 'max_rss': 'NA'})
+            continue
+        if before is not None:
+            before(stage)
+        rows.append(run_commands(package, stage, commands, folder, log_folder))
+        failed = rows[-1]['returncode'] != 0
+    return rows
+
+
+def file_hash(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(x) for x in glob.glob(os.path.join(folder, '*')) if os.path.isfile(x))
+
+
+def run(label, packages):
+    '''
+    benchmarks all stages of the data packages and the SA analysis
+    '''
+    folder = os.path.join(work_folder, label)
+    log_folder = os.path.join(benchmark_folder, label + '_logs')
+    os.makedirs(folder, exist_ok=True)
+    os.makedirs(log_folder, exist_ok=True)
+
+    rows = []
+    for package in packages:
+        dp_path = os.path.join(root, 'input_data', package, 'data')
+        os.makedirs(os.path.join(folder, 'results', package, 'model_0', 'results'), exist_ok=True)
+        rows += run_stages(package, get_commands(package, dp_path), folder, log_folder)
+
+    sa_folder = os.path.join(folder, 'gsa')
+    os.makedirs(os.path.join(sa_folder, 'SA'), exist_ok=True)
+    rows += run_stages('gsa', get_sa_commands(), sa_folder, log_folder,
+                       before=lambda stage: write_objective(sa_folder) if stage == 'calculate_SA' else None)
+
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True, text=True).stdout.strip()
+    metadata = {
+        'label': label,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'model_file': os.path.relpath(model_file, root),
+        'model_hash': file_hash(model_file),
+        'data_size_mb': {x: round(folder_size(os.path.join(root, 'input_data', x, 'data')) / 1e6, 2) for x in packages},
+        'sa_replicates': sa_replicates,
+    }
+
+    tsv_file = os.path.join(benchmark_folder, label + '.tsv')
+    with open(tsv_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, ['package', 'stage', 'returncode', 's', 'max_rss'], delimiter='\t')
+        writer.writeheader()
+        writer.writerows(rows)
+    json_file = os.path.join(benchmark_folder, label + '.json')
+    with open(json_file, 'w') as f:
+        json.dump({'metadata': metadata, 'stages': rows}, f, indent=2)
+    print(f'Benchmark written to {tsv_file} and {json_file}')
+
+
+def compare(baseline_file, current_file, tolerance):
+    '''
+    lists the stages that got slower or use more memory than the tolerance, returns True if there are none
+    '''
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+    with open(current_file, 'r') as f:
+        current = json.load(f)
+    before = {(x['package'], x['stage']): x for x in baseline['stages']}
+
+    print(f"{baseline['metadata']['label']} ({baseline['metadata']['commit']}) -> "
+          f"{current['metadata']['label']} ({current['metadata']['commit']})")
+    if baseline['metadata']['model_hash'] != current['metadata']['model_hash']:
+        print('The model file has changed')
+    for package, size in current['metadata']['data_size_mb'].items():
+        if baseline['metadata']['data_size_mb'].get(package, size) != size:
+            print(f"Data package {package} changed from {baseline['metadata']['data_size_mb'][package]} MB to {size} MB")
+
+    print('\n' + table_header(compare_columns))
+    regressions = []
+    for row in current['stages']:
+        key = (row['package'], row['stage'])
+        if key not in before or row['returncode'] != 0 or before[key]['returncode'] != 0:
+            continue
+        old = before[key]
+        time_ratio = row['s'] / old['s'] if old['s'] else 1
+        mem_ratio = (row['max_rss'] / old['max_rss']
+                     if 'NA' not in (row['max_rss'], old['max_rss']) and old['max_rss'] else 1)
+        flag = ''
+        if time_ratio > tolerance or mem_ratio > tolerance:
+            regressions.append(key)
+            flag = ' <-'
+        print(table_row(compare_columns, [key[0], key[1], old['s'], row['s'], time_ratio,
+                                          old['max_rss'], row['max_rss'], mem_ratio]) + flag)
+
+    if regressions:
+        print(f'\n{len(regressions)} stages exceed the tolerance of {tolerance}')
+        return False
+    print(f'\nNo stage exceeds the tolerance of {tolerance}')
+    return True
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'run':
+        label = sys.argv[2] if len(sys.argv) > 2 else datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        packages = sys.argv[3:] or sorted(
+            os.path.basename(os.path.dirname(x)) for x in glob.glob(os.path.join(root, 'input_data', 'Nordic*', 'data')))
+        run(label, packages)
+    elif len(sys.argv) in (4, 5) and sys.argv[1] == 'compare':
+        tolerance = float(sys.argv[4]) if len(sys.argv) == 5 else 1.2
+        if not compare(sys.argv[2], sys.argv[3], tolerance):
+            sys.exit(1)
+    else:
+        print("Usage: python scripts_py/benchmark_pipeline.py run [<label>] [<data package> ...]")
+        print("       python scripts_py/benchmark_pipeline.py compare <baseline.json> <current.json> [<tolerance>]")
+        sys.exit(1)
@@ -0,0 +1,152 @@
+'''
+This script benchmarks the pre-processing of otoole datafiles (scripts_smk/pre_process.py).
+It compares the line based parser (stream_otoole_lines, kept here as the reference) with the bulk
+tokenising parser of the ratio parameter blocks of pre_process.py and checks that both produce the
+same MODEx sets.
+
+The datafiles can be created with the convert_dp rule, e.g. working_directory/Nordic.txt, or with:
+
+    otoole convert csv datafile input_data/Nordic/data working_directory/Nordic.txt config/otoole.yaml
+
+Usage:
+
+    python scripts_py/benchmark_pre_process.py <datafile> [<datafile> ...]
+'''
+
+import os
+import sys
+import tempfile
+
+from benchmark_utils import best_time, speed_up, table_header, table_row
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts_smk'))
+from pre_process import PARAMS_TO_CHECK, SET_NAMES, parse_set_header, stream_otoole, write_modex_sets
+
+repeats = 5
+columns = [('datafile', '<40'), ('size [MB]', '>10.1f'), ('lines [s]', '>10.3f'), ('bulk [s]', '>10.3f'),
+           ('speed-up', '>10')]
+
+
+def read_modex_sets(filepath):
+    '''
+    returns the members of each MODEx set of a pre-processed datafile, ignoring their order
+    '''
+    sets = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.startswith(('set MODEper', 'set MODEx')):
+                name, members = line.split(':=', 1)
+                members = members.strip().rstrip(';').strip()
+                if members.startswith('('):
+                    sets[name] = sorted(members.replace(') (', ')|(').split('|'))
+                else:
+                    sets[name] = sorted(members.split())
+    return sets
+
+
+def stream_otoole_lines(data_infile, data_outfile):
+    '''
+    reference implementation of stream_otoole, every line of the ratio parameter blocks is split
+    and checked in Python, the output is byte-identical to the multi-pass implementation used for
+    the momani format, whose order within a set depends on PYTHONHASHSEED
+    '''
+    set_lists = {name: [] for name in SET_NAMES.values()}
+    parsing_set = None
+
+    with open(data_infile, 'r') as f, open(data_outfile, 'w') as file_out:
+        parsing = False
+        param_current = None
+
+        data_out = set()
+        data_inp = set()
+        data_all = set()
+        storage_to = set()
+        storage_from = set()
+        emission_table = set()
+
+        for line in f:
+            if not line.startswith(('set MODEper','set MODEx', 'end;')):
+                file_out.write(line)
+
+            if parsing_set is not None:
+                value = line.strip()
+                if value not in ['', ';']:
+                    set_lists[parsing_set].append(value)
+
+            if line.startswith('set '):
+                parsing_set = parse_set_header(line, set_lists) or parsing_set
+
+            details = line.split(' ')
+            if line.startswith(";"):
+                parsing_set = None
+                parsing = False
+
+            if parsing and len(details) > 1:
+                if param_current == 'OutputActivityRatio':
+                    tech = details[1].strip()
+                    fuel = details[2].strip()
+                    mode = details[3].strip()
+                    if float(details[5].strip()) != 0.0:
+                        data_out.add((fuel, tech, mode))
+                        data_all.add((tech, mode))
+
+                elif param_current == 'InputActivityRatio':
+                    tech = details[1].strip()
+                    fuel = details[2].strip()
+                    mode = details[3].strip()
+                    if float(details[5].strip()) != 0.0:
+                        data_inp.add((fuel, tech, mode))
+                        data_all.add((tech, mode))
+
+                elif param_current == 'TechnologyToStorage':
+                    tech = details[1].strip()
+                    storage = details[2].strip()
+                    mode = details[3].strip()
+                    if float(details[4].strip()) > 0.0:
+                        storage_to.add((storage, tech, mode))
+                        data_all.add((storage, mode))
+
+                elif param_current == 'TechnologyFromStorage':
+                    tech = details[1].strip()
+                    storage = details[2].strip()
+                    mode = details[3].strip()
+                    if float(details[4].strip()) > 0.0:
+                        storage_from.add((storage, tech, mode))
+                        data_all.add((storage, mode))
+
+                elif param_current == 'EmissionActivityRatio':
+                    tech = details[1].strip()
+                    emission = details[2].strip()
+                    mode = details[3].strip()
+                    if float(details[5].strip()) != 0.0:
+                        emission_table.add((emission, tech, mode))
+                        data_all.add((tech, mode))
+
+            if any(param in line for param in PARAMS_TO_CHECK):
+                param_current = details[-2]
+                parsing = True
+
+        write_modex_sets(file_out, set_lists, data_out, data_inp, data_all,
+                         storage_to, storage_from, emission_table, 'otoole')
+
+
+if __name__ == '__main__':
+
+    datafiles = sys.argv[1:]
+    if not datafiles:
+        print("Usage: python scripts_py/benchmark_pre_process.py <datafile> [<datafile> ...]")
+        sys.exit(1)
+
+    print(table_header(columns))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_lines = os.path.join(tmpdir, 'lines.txt')
+        out_bulk = os.path.join(tmpdir, 'bulk.txt')
+        for datafile in datafiles:
+            time_lines, _ = best_time(lambda: stream_otoole_lines(datafile, out_lines), repeats)
+            time_bulk, _ = best_time(lambda: stream_otoole(datafile, out_bulk), repeats)
+            if read_modex_sets(out_lines) != read_modex_sets(out_bulk):
+                print(f"MODEx sets differ for {datafile}")
+                sys.exit(1)
+            size = os.path.getsize(datafile) / 1e6
+            print(table_row(columns, [os.path.basename(datafile), size, time_lines, time_bulk,
+                                      speed_up(time_lines, time_bulk)]))
@@ -0,0 +1,57 @@
+'''
+This module holds the parts shared by the benchmark scripts (scripts_py/benchmark_*.py): the best wall
+time of repeated runs, the comparison of the files written by two implementations and the report table.
+
+The columns of a report table are given as (title, format spec) pairs, e.g. ('time [s]', '>10.3f'). The
+title is aligned and padded like the values, without the precision and type of the spec.
+'''
+
+import filecmp
+import os
+import re
+import time
+
+
+def best_time(run, repeats, prepare=None):
+    '''
+    returns the best wall time of several calls of run in seconds and the result of the last call,
+    prepare returns the arguments of each call and is not timed, e.g. fresh copies of the input data
+    '''
+    times = []
+    for _ in range(repeats):
+        args = prepare() if prepare is not None else ()
+        start = time.perf_counter()
+        result = run(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def differing_files(left, right):
+    '''
+    returns the files of two folders that differ byte for byte or are only in one of them
+    '''
+    files = sorted(os.listdir(left))
+    _, mismatch, errors = filecmp.cmpfiles(left, right, files, shallow=False)
+    missing = set(os.listdir(right)).symmetric_difference(files)
+    return sorted(set(mismatch + errors) | missing)
+
+
+def speed_up(before, after):
+    '''
+    returns the ratio of two wall times as text, e.g. 2.5x
+    '''
+    return f'{before / after:.1f}x'
+
+
+def table_header(columns):
+    '''
+    returns the header line of a report table
+    '''
+    return ' '.join(f"{title:{re.match(r'[<>^]?[0-9]*', spec).group()}}" for title, spec in columns)
+
+
+def table_row(columns, values):
+    '''
+    returns a line of a report table
+    '''
+    return ' '.join(f'{value:{spec}}' for (_, spec), value in zip(columns, values))
@@ -0,0 +1,174 @@
+'''
+This is a python script that runs several scenarios without the use of snakemake.
+
+Each scenario goes through the same stages as the baseline rules in scripts_smk/run.smk
+(otoole -> pre_process -> glpsol -> gurobi_cl -> convert_results). The scenarios run side by side,
+the number of processes of each stage running at the same time is limited separately, e.g. many
+glpsol processes but only a few solver processes with several threads each.
+
+The wall time and peak memory (RSS) of every stage are written to working_directory/run_parallel.tsv
+and summarised per stage at the end. The peak memory is only available on unix systems.
+
+Usage (from the main folder, the scenarios default to the BASELINE scenarios of the snakefile):
+
+    python scripts_py/run_parallel.py [<scenario> ...] [<stage>=<processes> ...] [threads=<solver threads>]
+
+e.g.
+
+    python scripts_py/run_parallel.py Nordic Nordic_no_h2 Nordic_co2_tax build_lp=3 solve=1 threads=8
+'''
+
+import csv
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASELINE = ['Nordic', 'Nordic_no_h2', 'Nordic_co2_limit', 'Nordic_em_free', 'Nordic_co2_tax']
+
+STAGES = ['convert', 'pre_process', 'build_lp', 'solve', 'convert_results']
+
+# number of processes of each stage running at the same time
+CONCURRENCY = {
+    'convert': 4,
+    'pre_process': 4,
+    'build_lp': 4,
+    'solve': 1,
+    'convert_results': 2,
+}
+SOLVER_THREADS = 4
+
+working_directory = 'working_directory'
+report_file = os.path.join(working_directory, 'run_parallel.tsv')
+
+
+def get_commands(scen, solver_threads):
+    '''
+    returns the commands of all stages of a scenario, the paths follow scripts_smk/run.smk
+    '''
+    config = os.path.join('config', 'otoole_osembe.yaml') if scen == 'OSeMBE' else os.path.join('config', 'otoole.yaml')
+    if scen == 'OSeMBE':
+        model = os.path.join('model', 'osemosys_osembe.txt')
+    elif scen == 'Nordic_test':
+        model = os.path.join('model', 'osemosys_test.txt')
+    else:
+        model = os.path.join('model', 'osemosys.txt')
+
+    dp_path = os.path.join('input_data', scen, 'data')
+    datafile = os.path.join(working_directory, scen + '.txt')
+    pre_file = os.path.join(working_directory, scen + '.pre')
+    lp_file = os.path.join(working_directory, scen + '.lp')
+    sol_file = os.path.join(working_directory, scen + '.sol')
+    res_folder = os.path.join('results', scen, 'results_csv')
+
+    return {
+        'convert': ['otoole', 'convert', 'csv', 'datafile', dp_path, datafile, config],
+        'pre_process': [sys.executable, os.path.join('scripts_smk', 'pre_process.py'), 'otoole', datafile, pre_file],
+        'build_lp': ['glpsol', '-m', model, '-d', pre_file, '--wlp', lp_file, '--check'],
+        'solve': ['gurobi_cl', f'Threads={solver_threads}', f'ResultFile={sol_file}',
+                  f'LogFile={os.path.join(working_directory, scen + "_gurobi.log")}', lp_file],
+        'convert_results': [sys.executable, os.path.join('scripts_smk', 'convert.py'), config, sol_file,
+                            res_folder.replace(os.sep, '/'), dp_path],
+    }
+
+
+def run_stage(command, log_path, cwd=None):
+    '''
+    runs a command and returns its exit code, wall time in seconds and peak RSS in MB
+    '''
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        try:
+            process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, cwd=cwd)
+        except FileNotFoundError as e:
+            log.write(f"Error: {e}\n")
+            return 127, time.perf_counter() - start, None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_rss = usage.ru_maxrss / 1024  # kilobytes on linux
+        else:
+            process.wait()
+            peak_rss = None
+    return process.returncode, time.perf_counter() - start, peak_rss
+
+
+def run_scenario(scen, commands, limits, report, lock):
+    '''
+    runs the stages of a scenario one after the other, waiting for a free slot of each stage
+    '''
+    for stage in STAGES:
+        log_path = os.path.join(working_directory, f'{scen}_{stage}.log')
+        with limits[stage]:
+            returncode, wall_time, peak_rss = run_stage(commands[stage], log_path)
+        with lock:
+            report.append({'scenario': scen, 'stage': stage, 'returncode': returncode,
+                           'wall_time': round(wall_time, 2),
+                           'peak_rss': round(peak_rss, 1) if peak_rss is not None else ''})
+            print(f'{scen}: {stage} done in {wall_time:.1f} s' if returncode == 0
+                  else f'{scen}: {stage} failed with exit code {returncode}, see {log_path}')
+        if returncode != 0:
+            return False
+    return True
+
+
+def print_summary(report, total_time):
+    '''
+    prints the wall time and peak RSS of every stage over all scenarios
+    '''
+    print(f"\n{'stage':<16} {'runs':>5} {'sum [s]':>10} {'max [s]':>10} {'peak RSS [MB]':>14}")
+    for stage in STAGES:
+        rows = [x for x in report if x['stage'] == stage]
+        if not rows:
+            continue
+        wall_times = [x['wall_time'] for x in rows]
+        peak_rss = [x['peak_rss'] for x in rows if x['peak_rss'] != '']
+        rss = f'{max(peak_rss):.1f}' if peak_rss else '-'
+        print(f'{stage:<16} {len(rows):>5} {sum(wall_times):>10.1f} {max(wall_times):>10.1f} {rss:>14}')
+    print(f'\nTotal wall time: {total_time:.1f} s')
+
+
+if __name__ == '__main__':
+
+    scenarios = []
+    concurrency = dict(CONCURRENCY)
+    solver_threads = SOLVER_THREADS
+    for arg in sys.argv[1:]:
+        if '=' not in arg:
+            scenarios.append(arg)
+            continue
+        key, value = arg.split('=', 1)
+        if key == 'threads':
+            solver_threads = int(value)
+        elif key in concurrency:
+            concurrency[key] = int(value)
+        else:
+            print(f"Unknown option {key}, use threads or one of {STAGES}")
+            sys.exit(1)
+    scenarios = scenarios or BASELINE
+
+    os.makedirs(working_directory, exist_ok=True)
+    limits = {stage: threading.BoundedSemaphore(concurrency[stage]) for stage in STAGES}
+    report = []
+    lock = threading.Lock()
+
+    # the stages run as separate processes, the threads only wait for them
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(scenarios)) as executor:
+        futures = {scen: executor.submit(run_scenario, scen, get_commands(scen, solver_threads), limits, report, lock)
+                   for scen in scenarios}
+        failed = [scen for scen, future in futures.items() if not future.result()]
+    total_time = time.perf_counter() - start
+
+    with open(report_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, ['scenario', 'stage', 'returncode', 'wall_time', 'peak_rss'], delimiter='\t')
+        writer.writeheader()
+        writer.writerows(report)
+
+    print_summary(report, total_time)
+    print(f'Report written to {report_file}')
+    if failed:
+        print(f'Failed scenarios: {failed}')
+        sys.exit(1)
@@ -1,10 +1,15 @@
 '''
 This script calculates additional result variables from the model output, such as the share of renewable energy and the share of CCS technology used.
 It creates new csv files with the results.
+With a model run name as second argument, the results are read from and written to the results store
+of the scenario (<store>/<result>/<model_run>.parquet, see scripts_smk/convert_sol.py) instead.
 '''
 
 # Import necessary packages
+import os
+import sys
 import pandas as pd
+from technology_index import TechnologyIndex
 
 
 #define lists for what techs are renewables, which are fossil and which are CCS 
@@ -26,11 +31,23 @@ ccs_techs = ['COCS','NGCS','BMCS']
 hydrogen_techs = ['BG','BC','SR','SC','EC']
 
 
-def load_data(folderpath):
+def load_data(folderpath, model_run=None):
+    if model_run is not None:
+        df = pd.read_parquet(f"{folderpath}/ProductionByTechnologyAnnual/{model_run}.parquet")
+        return df.drop(columns='MODELRUN')
     filepath = f"{folderpath}/ProductionByTechnologyAnnual.csv"
     df = pd.read_csv(filepath)
     return df
 
+def write_result(df, folderpath, name, model_run=None):
+    if model_run is not None:
+        os.makedirs(f"{folderpath}/{name}", exist_ok=True)
+        df = df.copy()
+        df.insert(0, 'MODELRUN', model_run)
+        df.to_parquet(f"{folderpath}/{name}/{model_run}.parquet", index=False)
+    else:
+        df.to_csv(f"{folderpath}/{name}.csv", index=False)
+
 def remove_unnecessary_techs_EL(df):
     tech_condition = df['TECHNOLOGY'].str.contains('00X|00I|EH1|IH1|HG|00TD') == False
     country_condition = df['TECHNOLOGY'].str.count('SE|NO|DK|FI|NL|UK') < 2
@@ -54,11 +71,14 @@ def remove_unnecessary_techs_HGFC(df):
     df.loc[:, 'country'] = df['TECHNOLOGY'].str[0:2]
     return df
 
-def calc_share(df, techs, tech_label):
-    country_prefixes = ('DK', 'SE', 'FI', 'NO')
-    df = df[df['TECHNOLOGY'].str.startswith(country_prefixes)].copy()
+def calc_share(df, techs, tech_label, index=None):
+    # index: TechnologyIndex of df['TECHNOLOGY'], shared by the calls on the same df
+    if index is None:
+        index = TechnologyIndex(df['TECHNOLOGY'])
+    country_mask = index.mask('^(?:DK|SE|FI|NO)')
     tech_regex = '|'.join(techs)
-    df_tech = df[df['TECHNOLOGY'].str.contains(tech_regex)].copy()    
+    df_tech = df[country_mask & index.mask(tech_regex)].copy()
+    df = df[country_mask].copy()
     df_tech['country'] = df_tech['TECHNOLOGY'].str[0:2]  
     df_tech_grouped = df_tech.groupby(['YEAR','country']).sum().reset_index()
 
@@ -125,26 +145,37 @@ def calc_sum(df, techs, tech_label):
 
 if __name__ == "__main__":
     
-    #folderpath = snakemake.params[0] #path to folder with results
-    folderpath = "results/Nordic_co2_tax/results_csv"
-    df = load_data(folderpath)
+    model_run = None #set when reading from the results store
+    if "snakemake" in globals():
+        folderpath = snakemake.params[0] #path to folder with results
+        if len(snakemake.params) > 1:
+            model_run = snakemake.params[1]
+    elif len(sys.argv) in (2, 3):
+        folderpath = sys.argv[1]
+        if len(sys.argv) == 3:
+            model_run = sys.argv[2]
+    else:
+        folderpath = "results/Nordic_co2_tax/results_csv"
+    df = load_data(folderpath, model_run)
     df_el = remove_unnecessary_techs_EL(df)
-    df_ren = calc_share(df_el, renewable_techs, 'ELRENEW')
-    df_foss = calc_share(df_el, fossil_techs, 'ELFOSSIL')
-    df_ccs = calc_share(df_el, ccs_techs, 'ELCCS')
+    index_el = TechnologyIndex(df_el['TECHNOLOGY'])
+    df_ren = calc_share(df_el, renewable_techs, 'ELRENEW', index_el)
+    df_foss = calc_share(df_el, fossil_techs, 'ELFOSSIL', index_el)
+    df_ccs = calc_share(df_el, ccs_techs, 'ELCCS', index_el)
     df_hg = remove_unnecessary_techs_HG(df)
+    index_hg = TechnologyIndex(df_hg['TECHNOLOGY'])
     for tech in hydrogen_techs:
         if tech == 'EC':
             techs = [tech,'EA']
         else: techs = [tech]
-        df_tech = calc_share(df_hg, techs, tech)
+        df_tech = calc_share(df_hg, techs, tech, index_hg)
         df_ren = pd.concat([df_ren, df_tech], ignore_index=True)
     df_new = pd.concat([df_ren, df_foss, df_ccs], ignore_index=True)    
-    df_new.to_csv(f"{folderpath}/AnnualShareOfProduction.csv", index=False)
+    write_result(df_new, folderpath, 'AnnualShareOfProduction', model_run)
 
     df_hgfc = remove_unnecessary_techs_HGFC(df)
     df_hgfc = calc_sum(df_hgfc, ['HGFCPN2'], 'HGFCPN2')
-    df_hgfc.to_csv(f"{folderpath}/ProductionFromFuelCells.csv", index=False)
+    write_result(df_hgfc, folderpath, 'ProductionFromFuelCells', model_run)
 
     print("New result variables have been calculated and written to csv files for the following folder: ", folderpath)
 
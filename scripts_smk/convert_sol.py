@@ -0,0 +1,310 @@
+"""Converts a gurobi solution file into the result files without ``otoole.convert_results``
+
+Arguments
+---------
+<path_config>
+    Path to the otoole configuration file
+<path_gurobi.sol>
+    Path to the gurobi solution file
+<path_results>
+    Path to the results folder, or to the results store of the scenario with ``store``
+<path_data>
+    Path to the csv folder of the model run
+<format>
+    ``csv`` (default), ``parquet`` or ``store``
+<results>
+    Comma separated names of the results to write, all results of the otoole configuration
+    if not given
+
+The results are the same as with ``otoole.convert_results``, only the reading is faster:
+
+- The variable lines of the solution file are read in chunks and the zero values are
+  dropped before the names are split, so only the non-zero values are held in memory.
+- The variable names are split once and the values are grouped by variable in a single
+  pass, instead of scanning all values once for every result in the otoole configuration.
+- Only the sets and the parameters used by otoole to calculate the derived results
+  (``REQUIRED_PARAMETERS``) are read from the csv folder of the model run.
+- ``AccumulatedNewCapacity``, the slowest of the derived results in otoole, is summed on
+  numpy arrays (``SolResultsPackage``).
+
+A set used twice by a result, e.g. ``REGION`` in ``Trade``, is renamed like in otoole, e.g. to
+``REGION`` and ``_REGION``. Each column holds its own set of the solution file, otoole writes the
+last of the duplicate sets to both columns.
+
+With ``csv``, the files are written by otoole and match the files of ``convert.py``.
+With ``parquet``, every result is written to ``<result>.parquet`` with the same columns.
+With ``store``, every result is added to the results store of the scenario as
+``<path_results>/<result>/<model_run>.parquet`` with a ``MODELRUN`` column, where the model run
+is the name of the solution file, e.g. ``model_3``. The files of a result form one parquet
+dataset that is read at once by ``extract_results.py``.
+
+If only some results are selected, the variables of the solution file are only converted
+when a selected result is read from them or calculated from them (``LazyResults``), the
+other variables and results are skipped.
+
+To run this script on the command line, use the following::
+
+    python scripts_smk/convert_sol.py <path_config> <path_gurobi.sol> <path_results> <path_data> [<format>] [<results>]
+
+The ``res-csv_done.txt`` file is written to the parent folder of ``<path_results>``, or to the
+folder of the solution file with ``store``.
+
+"""
+import datetime
+import logging
+import os
+import sys
+from collections.abc import Mapping
+from typing import Dict, List
+
+import pandas as pd
+from otoole.read_strategies import ReadCsv
+from otoole.results.result_package import ResultsPackage
+from otoole.results.results import ReadGurobi, check_for_duplicates, rename_duplicate_column
+from otoole.utils import _read_file
+from otoole.write_strategies import WriteCsv
+
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# input parameters used by otoole.results.result_package.ResultsPackage
+REQUIRED_PARAMETERS = [
+    'CapitalCost',
+    'CapitalCostStorage',
+    'DiscountRate',
+    'DiscountRateIdv',
+    'DiscountRateStorage',
+    'EmissionActivityRatio',
+    'EmissionsPenalty',
+    'FixedCost',
+    'InputActivityRatio',
+    'OperationalLife',
+    'OutputActivityRatio',
+    'ResidualCapacity',
+    'SpecifiedAnnualDemand',
+    'SpecifiedDemandProfile',
+    'VariableCost',
+    'YearSplit',
+]
+
+CHUNKSIZE = 1000000
+
+
+class ReadRequiredCsv(ReadCsv):
+    """Reads the sets and the ``REQUIRED_PARAMETERS`` of a csv folder"""
+
+    def __init__(self, user_config: Dict):
+        required = {x: y for x, y in user_config.items()
+                    if y['type'] == 'set' or (y['type'] == 'param' and x in REQUIRED_PARAMETERS)}
+        super().__init__(user_config=required)
+
+    def _compare_read_to_expected(self, names: List[str], short_names: bool = False) -> None:
+        # the csv folder holds all parameters, only the required ones are read
+        pass
+
+
+class LazyResults(Mapping):
+    """Variables of a solution file, converted to long format when first accessed
+
+    Parameters
+    ----------
+    groups : Dict[str, pd.DataFrame]
+        Non-zero values of the solution file by variable
+    convert : Callable
+        Converts the values of a variable, called with the name and the values
+    """
+
+    def __init__(self, groups: Dict[str, pd.DataFrame], convert):
+        self._groups = groups
+        self._convert = convert
+        self._converted = {}
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name not in self._converted:
+            self._converted[name] = self._convert(name, self._groups[name])
+        return self._converted[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._groups
+
+    def __iter__(self):
+        return iter(self._groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+
+class SolResultsPackage(ResultsPackage):
+    """``ResultsPackage`` with a faster calculation of ``AccumulatedNewCapacity``"""
+
+    def accumulated_new_capacity(self) -> pd.DataFrame:
+        """AccumulatedNewCapacity
+
+        Same as ``ResultsPackage.accumulated_new_capacity``, but the sums are computed on numpy
+        arrays and set at once instead of one ``.loc`` assignment per technology and year. The
+        capacities are summed in the same order, so the values are identical.
+        """
+        try:
+            new_capacity = self["NewCapacity"].copy()
+            year = pd.Index(self["YEAR"]["VALUE"].to_list())
+        except KeyError as ex:
+            raise KeyError(self._msg("AccumulatedNewCapacity", str(ex)))
+
+        new_capacity["OperationalLife"] = self["OperationalLife"].copy()
+
+        regions = new_capacity.reset_index()["REGION"].unique()
+        technologies = new_capacity.reset_index()["TECHNOLOGY"].unique()
+
+        index = pd.MultiIndex.from_product(
+            [regions, technologies, year.to_list()],
+            names=["REGION", "TECHNOLOGY", "YEAR"],
+        )
+
+        acc_capacity = new_capacity.reindex(index, copy=True)
+        values = acc_capacity["VALUE"].to_numpy(dtype=float, copy=True)
+        years = year.to_numpy()
+
+        for (region, technology), data in new_capacity.reset_index().groupby(
+            by=["REGION", "TECHNOLOGY"]
+        ):
+            built = data["YEAR"].to_numpy()
+            life = data["OperationalLife"].to_numpy()
+            capacity = data["VALUE"].to_numpy(dtype=float)
+            rows = index.get_indexer([(region, technology, yr) for yr in years])
+            for row, yr in zip(rows, years):
+                mask = (yr - built < life) & (yr - built >= 0)
+                values[row] = capacity[mask].sum()
+
+        acc_capacity = acc_capacity.drop(columns="OperationalLife")
+        acc_capacity["VALUE"] = values
+        return acc_capacity[(acc_capacity != 0).all(1)]
+
+
+class ReadGurobiSol(ReadGurobi):
+    """Reads a gurobi solution file in one pass over the non-zero values
+
+    Parameters
+    ----------
+    user_config : Dict
+        otoole configuration
+    results : List[str], optional
+        Names of the results to calculate, all results of the configuration if None
+    """
+
+    def __init__(self, user_config: Dict, results: List[str] = None):
+        super().__init__(user_config=user_config)
+        self.selected = sorted(self.results_config) if results is None else sorted(results)
+        unknown = [x for x in self.selected if x not in self.results_config]
+        if unknown:
+            raise ValueError(f"{unknown} are not results of the otoole configuration")
+
+    def _convert_to_dataframe(self, file_path: str) -> pd.DataFrame:
+        chunks = pd.read_csv(
+            file_path,
+            header=None,
+            sep=" ",
+            names=["Variable", "Value"],
+            skiprows=2,
+            chunksize=CHUNKSIZE,
+        )
+        df = pd.concat([chunk[chunk["Value"] != 0] for chunk in chunks], ignore_index=True)
+        names = df["Variable"].str.partition("(")
+        df["Variable"] = names[0]
+        df["Index"] = names[2].str.replace(")", "", regex=False)
+        return df[["Variable", "Index", "Value"]].astype({"Value": float})
+
+    def _convert_variable(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Converts the values of a variable like ``ReadWideResults._convert_wide_to_long``"""
+        logger.debug("Extracting results for %s", name)
+        indices = self.results_config[name]["indices"]
+        # a set used twice, e.g. REGION in Trade, is renamed like in otoole, e.g. to _REGION
+        index = rename_duplicate_column(indices) if check_for_duplicates(indices) else indices
+        values = df["Index"].str.split(",", expand=True)
+        values.columns = index
+        values = values.astype({column: self.user_config[set_name]["dtype"]
+                                for column, set_name in zip(index, indices)})
+        values["VALUE"] = df["Value"]
+        return values[index + ["VALUE"]].set_index(index)
+
+    def _convert_wide_to_long(self, data: pd.DataFrame) -> LazyResults:
+        """Splits the values by variable, each variable is converted when it is first used"""
+        groups = {name: df for name, df in data.groupby("Variable", sort=False)
+                  if name in self.results_config}
+        not_found = [x for x in self.results_config if x not in groups]
+        logger.debug("Unable to find result variables for: %s", ", ".join(not_found))
+        return LazyResults(groups, self._convert_variable)
+
+    def calculate_results(
+            self,
+            available_results: Dict[str, pd.DataFrame],
+            input_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Same as ``ReadResults.calculate_results`` for the selected results, with ``SolResultsPackage``"""
+        results = {}
+        results_package = SolResultsPackage(available_results, input_data)
+
+        for name in self.selected:
+            try:
+                results[name] = results_package[name]
+            except KeyError as ex:
+                logger.debug("Error calculating %s: %s", name, str(ex))
+
+        return results
+
+
+def write_parquet(results: Dict[str, pd.DataFrame], folder: str):
+    """Writes each result to ``<folder>/<result>.parquet``"""
+    os.makedirs(folder, exist_ok=True)
+    for name, df in results.items():
+        df.reset_index().to_parquet(os.path.join(folder, f"{name}.parquet"), index=False)
+
+
+def write_store(results: Dict[str, pd.DataFrame], store: str, model_run: str):
+    """Adds each result of a model run to ``<store>/<result>/<model_run>.parquet``"""
+    for name, df in results.items():
+        os.makedirs(os.path.join(store, name), exist_ok=True)
+        df = df.reset_index()
+        df.insert(0, "MODELRUN", model_run)
+        df.to_parquet(os.path.join(store, name, f"{model_run}.parquet"), index=False)
+
+
+def main(user_config: Dict, path_sol: str, path_res: str, path_dp: str, file_format: str = 'csv',
+         results: List[str] = None):
+
+    input_data, _ = ReadRequiredCsv(user_config).read(path_dp)
+    results, default_values = ReadGurobiSol(user_config, results).read(path_sol, input_data=input_data)
+
+    if file_format == 'parquet':
+        write_parquet(results, path_res)
+    elif file_format == 'store':
+        write_store(results, path_res, os.path.splitext(os.path.basename(path_sol))[0])
+    else:
+        WriteCsv(user_config=user_config).write(results, path_res, default_values)
+    logger.info(f"Wrote {len(results)} results to {path_res}")
+
+
+if __name__ == "__main__":
+
+    args = sys.argv[1:]
+
+    if len(args) not in (4, 5, 6) or (len(args) > 4 and args[4] not in ('csv', 'parquet', 'store')):
+        print("Usage: python scripts_smk/convert_sol.py <path_config> <path_gurobi.sol> <path_results> <path_data> [csv|parquet|store] [<result>,<result>,...]")
+        sys.exit(1)
+
+    path_config, path_sol, path_res, path_dp = args[:4]
+    file_format = args[4] if len(args) > 4 else 'csv'
+    results = args[5].split(',') if len(args) > 5 else None
+
+    _, ending = os.path.splitext(path_config)
+    with open(path_config, "r") as f:
+        user_config = _read_file(f, ending)
+
+    if os.path.exists(path_sol):
+        main(user_config, path_sol, path_res, path_dp, file_format, results)
+
+    done_folder = os.path.dirname(path_sol) if file_format == 'store' else os.path.dirname(path_res.rstrip('/'))
+    with open(os.path.join(done_folder, "res-csv_done.txt"), "w") as f:
+        f.write("File created or updated at: " + str(datetime.datetime.now()))
+    print("Conversion into csv results done.")
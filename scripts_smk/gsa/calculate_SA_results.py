@@ -167,7 +167,7 @@ if __name__ == "__main__":
     if result_type == 'objective':
         Y = pd.read_csv(model_results)['OBJECTIVE'].to_numpy()
     elif result_type == 'variable':
-        results = pd.read_csv(model_results)
+        results = utils.read_results(model_results) # csv, parquet or feather, e.g. from the results store
         Y = parse_user_defined_results(results)
     else:
         raise ValueError(
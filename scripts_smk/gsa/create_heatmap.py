@@ -173,6 +173,6 @@ if __name__ == "__main__":
         with open(parameters_file, 'r') as csv_file:
             parameters = list(csv.DictReader(csv_file))
         X = np.loadtxt(sample, delimiter=',')
-        results = pd.read_csv(result_file)
+        results = utils.read_results(result_file) # csv, parquet or feather, e.g. from the results store
         main(parameters, X, results, save_file, scaled)
     
@@ -8,6 +8,10 @@ Arguments
     Path to the new model file directory
 <sample_filepath>
     Path the sample file
+<user_config>
+    Path to the otoole configuration file
+<cache_directory>
+    Optional directory of the baseline cache
 
 The expected format of the input sample file is a CSV file with the following structure::
 
@@ -17,9 +21,19 @@ The expected format of the input sample file is a CSV file with the following st
 It is very similar to the overall ``parameter.csv`` configuration file, except holds a sample value
 rather than a range
 
+The parsed and sorted master model parameters are cached as a pickle in the cache directory,
+keyed by a hash of the csv files and the otoole configuration. All model runs of a scenario
+then load the same baseline instead of parsing the csv files again.
+
 To run this script on the command line, use the following::
 
-    python create_modelrun.py <input_filepath> <output_filepath> <sample_filepath>
+    python create_modelrun.py <input_filepath> <output_filepath> <sample_filepath> <user_config> [<cache_directory>]
+
+In batch mode all model runs of the morris sample are created in one process, the baseline
+is read once and the runs are written to ``<output_filepath>/model_<n>/data``, optionally
+with several processes::
+
+    python create_modelrun.py --batch <input_filepath> <output_filepath> <morris_sample> <parameters_filepath> <user_config> [<processes>]
 
 """
 import sys
@@ -27,7 +41,12 @@ import sys
 from typing import Dict, List, Union, Tuple, Any, Optional
 
 import csv
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import json
+import pickle
 import sys
+import tempfile
 import pandas as pd
 import numpy as np
 from otoole.read_strategies import ReadCsv
@@ -36,6 +55,8 @@ from otoole.utils import _read_file
 import os
 import logging
 
+from expand_sample import create_sample_rows
+
 logging.basicConfig(
     level=logging.INFO,  # Set the logging level to INFO
     handlers=[logging.StreamHandler(sys.stdout)]  # Write logs to stdout
@@ -244,10 +265,61 @@ def apply_interploted_values(
         raise ValueError(ex)
     return model_params
 
+def apply_batched_values(
+    name : str,
+    model_params : Dict[str, pd.DataFrame],
+    updates : Dict[Tuple, float]
+) -> Dict[str, pd.DataFrame]:
+    """Applies all new values of a parameter in one vectorised assignment.
+
+    Values of existing rows are replaced in place, rows that don't exist yet
+    are appended in the order of ``updates``, like the row by row ``.loc``
+    assignments do.
+
+    Parameters
+    ----------
+    name : str
+        name of OSeMOSYS parameter
+    model_params : Dict[str, pd.DataFrame]
+        Original input OSeMOSYS parameters
+    updates : Dict[Tuple, float]
+        New values keyed by the full index of the parameter
+
+    Returns
+    -------
+    model_params : Dict[str, pd.DataFrame]
+        Updated input OSeMOSYS parameters
+
+    Raises
+    ------
+    ValueError
+        If the index of the original dataframe is not unique
+    """
+    df = model_params[name]
+    if df.index.nlevels > 1:
+        index = pd.MultiIndex.from_tuples(list(updates.keys()), names=df.index.names)
+    else:
+        index = pd.Index([key[0] for key in updates.keys()], name=df.index.name)
+    values = np.fromiter(updates.values(), dtype=float, count=len(updates))
+
+    try:
+        new_rows = ~index.isin(df.index)
+        if new_rows.any():
+            df = pd.concat([df, pd.DataFrame({'VALUE': values[new_rows]}, index=index[new_rows])])
+        positions = df.index.get_indexer(index)
+        df.iloc[positions, df.columns.get_loc('VALUE')] = values
+    except pd.errors.InvalidIndexError as ex:
+        logger.error(f"Error raised in parameter {name}, the index is not unique")
+        raise ValueError(ex)
+
+    model_params[name] = df
+    return model_params
+
 def modify_parameters(
         model_params: Dict[str, pd.DataFrame],
         parameters: List[Dict[str, Union[str, int, float]]],
-        config: Dict) ->  Dict[str, pd.DataFrame]:
+        config: Dict,
+        batched: bool = True) ->  Dict[str, pd.DataFrame]:
     """Modifies model parameters based on Morris Sample. 
 
     The action and interpolation method are read in from the parameters argument
@@ -262,6 +334,10 @@ def modify_parameters(
 
     If the interpolation index is set to `None`, then no interpolation takes place. 
 
+    If `batched` is set, the new values are grouped by OSeMOSYS parameter and each
+    parameter is updated in one vectorised assignment. Parameters with a sample index
+    that doesn't cover all of their indices are updated row by row.
+
     Parameters
     ----------
     model_params: Dict[str, pd.DataFrame]
@@ -270,6 +346,8 @@ def modify_parameters(
         Flattened input parameters for the individual model run
     config : Dict
         Input configurarion file 
+    batched : bool = True
+        Whether to apply the new values per parameter instead of per row
 
     Returns
     -------
@@ -280,6 +358,9 @@ def modify_parameters(
     first_year = model_params['YEAR'].min().values[0]
     end_year = model_params['YEAR'].max().values[0]
 
+    updates = {}
+    row_by_row = set()
+
     for parameter in parameters:
 
         # retrieve input data
@@ -295,6 +376,18 @@ def modify_parameters(
         new_values = apply_interpolation_action(action, inter_index, start_year_value,
             end_year_value, first_year, end_year)
 
+        if batched:
+            parameter_updates = updates.setdefault(name, [])
+            if inter_index == 'YEAR':
+                parameter_updates.append((tuple(index), new_values, True))
+                depth = len(index) + 1
+            else:
+                parameter_updates.append((tuple(index), new_values, False))
+                depth = len(index)
+            if depth != len(config[name]['indices']):
+                row_by_row.add(name)
+            continue
+
         # apply interpolated values
         logger.info("Updating values for {} in {}".format(index, name))
         if inter_index == 'YEAR':
@@ -303,27 +396,223 @@ def modify_parameters(
         else:
             model_params = apply_interploted_values(name, model_params, index, new_values)
 
+    years = range(first_year, end_year + 1)
+    for name, parameter_updates in updates.items():
+        logger.info("Updating {} values in {}".format(len(parameter_updates), name))
+        if name in row_by_row:
+            for index, new_values, yearly in parameter_updates:
+                if yearly:
+                    model_params = apply_yearly_interploted_values(name, model_params, list(index),
+                        new_values, first_year, end_year)
+                else:
+                    model_params = apply_interploted_values(name, model_params, list(index), new_values)
+            continue
+
+        # later rows of the sample overwrite earlier ones, like the row by row assignment
+        values = {}
+        for index, new_values, yearly in parameter_updates:
+            if yearly:
+                for year, value in zip(years, new_values.flatten().astype(float)):
+                    values[index + (year,)] = value
+            else:
+                values[index] = float(new_values[0])
+        model_params = apply_batched_values(name, model_params, values)
+
     return model_params
 
-def main(
-    input_filepath, 
-    output_filepath, 
-    parameters: List[Dict[str, Union[str, int, float]]],
-    user_config):
+def hash_baseline(input_filepath: str, user_config: Dict) -> str:
+    """Hashes the csv files of the master model and the otoole configuration
+
+    Parameters
+    ----------
+    input_filepath : str
+        Path to the master model csv directory
+    user_config : Dict
+        otoole configuration file
+
+    Returns
+    -------
+    str
+        Hex digest of the csv file names and contents and of the configuration
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(user_config, sort_keys=True, default=str).encode())
+    for filename in sorted(os.listdir(input_filepath)):
+        filepath = os.path.join(input_filepath, filename)
+        if not os.path.isfile(filepath):
+            continue
+        digest.update(filename.encode())
+        with open(filepath, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def load_baseline(
+    input_filepath: str,
+    user_config: Dict,
+    cache_directory: Optional[str] = None
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, float]]:
+    """Reads the master model parameters with sorted indices, using the baseline cache
 
-    model_params, default_values = ReadCsv(user_config=user_config).read(input_filepath)
+    Parameters
+    ----------
+    input_filepath : str
+        Path to the master model csv directory
+    user_config : Dict
+        otoole configuration file, the index dtypes of the parameters are added by otoole
+    cache_directory : Optional[str] = None
+        Directory of the baseline cache, the cache is not used if not set
+
+    Returns
+    -------
+    Tuple[Dict[str, pd.DataFrame], Dict[str, float]]
+        Input OSeMOSYS parameters and their default values
+    """
+    cache_filepath = None
+    if cache_directory:
+        key = hash_baseline(input_filepath, user_config)
+        cache_filepath = os.path.join(cache_directory, key + '.pickle')
+
+    read_strategy = ReadCsv(user_config=user_config)
+
+    if cache_filepath and os.path.exists(cache_filepath):
+        try:
+            with open(cache_filepath, 'rb') as f:
+                model_params, default_values = pickle.load(f)
+            logger.info("Loaded baseline of {} from {}".format(input_filepath, cache_filepath))
+            return model_params, default_values
+        except (OSError, EOFError, pickle.UnpicklingError) as ex:
+            logger.warning(f"Ignoring baseline cache {cache_filepath}: {ex}")
 
     logger.info("Reading csv directory {}".format(input_filepath))
+    model_params, default_values = read_strategy.read(input_filepath)
     for name, parameter in model_params.items():
         parameter = parameter.sort_index()
         model_params[name] = parameter
+
+    if cache_filepath:
+        # model runs of a scenario may be created in parallel, the cache file is replaced atomically
+        os.makedirs(cache_directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_directory, suffix='.tmp', delete=False) as f:
+            pickle.dump((model_params, default_values), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, cache_filepath)
+        logger.info("Cached baseline of {} in {}".format(input_filepath, cache_filepath))
+
+    return model_params, default_values
+
+def main(
+    input_filepath, 
+    output_filepath, 
+    parameters: List[Dict[str, Union[str, int, float]]],
+    user_config,
+    cache_directory: Optional[str] = None):
+
+    model_params, default_values = load_baseline(input_filepath, user_config, cache_directory)
+    model_params = modify_parameters(model_params, parameters, user_config)
+    WriteCsv(user_config=user_config).write(model_params, output_filepath, default_values)
+
+
+def write_modelrun(
+    output_filepath: str,
+    parameters: List[Dict[str, Union[str, int, float]]],
+    model_params: Dict[str, pd.DataFrame],
+    default_values: Dict[str, float],
+    user_config: Dict):
+    """Writes the csv files of a model run without changing the baseline
+
+    Parameters
+    ----------
+    output_filepath : str
+        Path to the new model file directory
+    parameters : List[Dict[str, Union[str, int, float]]]
+        Flattened input parameters for the individual model run
+    model_params : Dict[str, pd.DataFrame]
+        Input OSeMOSYS parameters of the baseline
+    default_values : Dict[str, float]
+        Default values of the parameters
+    user_config : Dict
+        otoole configuration file
+    """
+    # only the sampled parameters are modified, all others are shared with the baseline
+    model_params = dict(model_params)
+    for name in {parameter['name'] for parameter in parameters}:
+        model_params[name] = model_params[name].copy()
     model_params = modify_parameters(model_params, parameters, user_config)
     WriteCsv(user_config=user_config).write(model_params, output_filepath, default_values)
 
+_baseline = {}
+
+def _init_worker(model_params, default_values, user_config):
+    """Stores the baseline once per worker process"""
+    _baseline['model_params'] = model_params
+    _baseline['default_values'] = default_values
+    _baseline['user_config'] = user_config
+
+def _write_modelrun_worker(output_filepath, parameters):
+    write_modelrun(output_filepath, parameters, _baseline['model_params'],
+        _baseline['default_values'], _baseline['user_config'])
+    return output_filepath
+
+def batch(
+    input_filepath: str,
+    output_filepath: str,
+    morris_sample: np.ndarray,
+    parameters: List[Dict[str, str]],
+    user_config: Dict,
+    processes: int = 1):
+    """Creates the model runs of all rows of a morris sample
+
+    Parameters
+    ----------
+    input_filepath : str
+        Path to the master model csv directory
+    output_filepath : str
+        Path to the scenario directory, the model runs are written to ``model_<n>/data``
+    morris_sample : np.ndarray
+        Morris sample with one row per model run
+    parameters : List[Dict[str, str]]
+        Rows of the parameters configuration file
+    user_config : Dict
+        otoole configuration file
+    processes : int = 1
+        Number of processes writing model runs
+    """
+    model_params, default_values = load_baseline(input_filepath, user_config)
+    modelruns = [
+        (os.path.join(output_filepath, f"model_{model_run}", "data"), create_sample_rows(sample_row, parameters))
+        for model_run, sample_row in enumerate(morris_sample)
+    ]
+    logger.info("Creating {} model runs in {} with {} processes".format(len(modelruns), output_filepath, processes))
+
+    if processes <= 1:
+        for folder, sample in modelruns:
+            write_modelrun(folder, sample, model_params, default_values, user_config)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(model_params, default_values, user_config)) as executor:
+        futures = [executor.submit(_write_modelrun_worker, folder, sample) for folder, sample in modelruns]
+        for future in futures:
+            logger.info("Created model run {}".format(future.result()))
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 5:
-        print("Usage: python create_modelrun.py <input_filepath> <output_filepath> <sample_filepath> <user_config>")
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        if len(sys.argv) not in (7, 8):
+            print("Usage: python create_modelrun.py --batch <input_filepath> <output_filepath> <morris_sample> <parameters_filepath> <user_config> [<processes>]")
+            sys.exit(1)
+        morris_sample = np.loadtxt(sys.argv[4], delimiter=",", ndmin=2)
+        with open(sys.argv[5], 'r') as csv_file:
+            parameter_list = list(csv.DictReader(csv_file))
+
+        _, ending = os.path.splitext(sys.argv[6])
+        with open(sys.argv[6], "r") as f:
+            user_config = _read_file(f, ending)
+
+        processes = int(sys.argv[7]) if len(sys.argv) == 8 else 1
+        batch(sys.argv[2], sys.argv[3], morris_sample, parameter_list, user_config, processes)
+
+    elif len(sys.argv) not in (5, 6):
+        print("Usage: python create_modelrun.py <input_filepath> <output_filepath> <sample_filepath> <user_config> [<cache_directory>]")
     else:
         with open(sys.argv[3], 'r') as csv_file:
             sample = list(csv.DictReader(csv_file))
@@ -332,7 +621,8 @@ if __name__ == "__main__":
         with open(sys.argv[4], "r") as f:
             user_config = _read_file(f, ending)
 
-        main(sys.argv[1], sys.argv[2], sample, user_config)
+        cache_directory = sys.argv[5] if len(sys.argv) == 6 else None
+        main(sys.argv[1], sys.argv[2], sample, user_config, cache_directory)
     
     #for debugging:
     # with open("modelruns/0/model_0/sample_0.txt", 'r') as csv_file:
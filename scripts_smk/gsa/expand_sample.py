@@ -46,6 +46,51 @@ def assign_sample_value(min_value, max_value, sample):
     points = [0, 1]
     return np.interp(sample, points, values)
 
+def create_sample_rows(sample_row, parameters) -> List[dict]:
+    """Scales a row of the morris sample to the parameter ranges of one model run"""
+    rows = []
+    for column, param in zip(sample_row, parameters):
+
+        try:
+            min_by = float(param['min_value_base_year'])
+            max_by = float(param['max_value_base_year'])
+            min_ey = float(param['min_value_end_year'])
+            max_ey = float(param['max_value_end_year'])
+        except ValueError as ex:
+            print(param)
+            raise ValueError(str(ex))
+
+        # check for a fixed endpoints
+        if math.isclose(min_by, max_by):
+            value_base_year = min_by
+        else:
+            value_base_year = (max_by - min_by) * column + min_by
+
+        if math.isclose(min_ey, max_ey):
+            value_end_year = min_ey
+        else:
+            value_end_year =  (max_ey - min_ey) * column + min_ey
+            
+        # check for datatype on interpolation index
+        # ie. Solves issues further down the workflow 
+        if param['interpolation_index']:
+            if param['interpolation_index'] in ['None', 'none', '']:
+                interpolation_index = None
+            else:
+                interpolation_index = param['interpolation_index']
+        else:
+            interpolation_index = None
+
+        data = {'name': param['name'],
+                'indexes': param['indexes'],
+                'value_base_year': value_base_year,
+                'value_end_year': value_end_year,
+                'action': param['action'],
+                'interpolation_index': interpolation_index}
+        rows.append(data)
+        #logger.info(data)
+    return rows
+
 def main(morris_sample, parameters, output_files):
     try:
         for model_run, sample_row in enumerate(morris_sample):           
@@ -55,47 +100,7 @@ def main(morris_sample, parameters, output_files):
                 fieldnames = ['name', 'indexes', 'value_base_year', 'value_end_year', 'action', 'interpolation_index']
                 writer = csv.DictWriter(csvfile, fieldnames)
                 writer.writeheader()
-
-                for column, param in zip(sample_row, parameters):
-
-                    try:
-                        min_by = float(param['min_value_base_year'])
-                        max_by = float(param['max_value_base_year'])
-                        min_ey = float(param['min_value_end_year'])
-                        max_ey = float(param['max_value_end_year'])
-                    except ValueError as ex:
-                        print(param)
-                        raise ValueError(str(ex))
-
-                    # check for a fixed endpoints
-                    if math.isclose(min_by, max_by):
-                        value_base_year = min_by
-                    else:
-                        value_base_year = (max_by - min_by) * column + min_by
-
-                    if math.isclose(min_ey, max_ey):
-                        value_end_year = min_ey
-                    else:
-                        value_end_year =  (max_ey - min_ey) * column + min_ey
-                        
-                    # check for datatype on interpolation index
-                    # ie. Solves issues further down the workflow 
-                    if param['interpolation_index']:
-                        if param['interpolation_index'] in ['None', 'none', '']:
-                            interpolation_index = None
-                        else:
-                            interpolation_index = param['interpolation_index']
-                    else:
-                        interpolation_index = None
-
-                    data = {'name': param['name'],
-                            'indexes': param['indexes'],
-                            'value_base_year': value_base_year,
-                            'value_end_year': value_end_year,
-                            'action': param['action'],
-                            'interpolation_index': interpolation_index}
-                    writer.writerow(data)
-                    #logger.info(data)
+                writer.writerows(create_sample_rows(sample_row, parameters))
         #logger.info("The sample has been written to {}".format(filepath))
     except Exception as ex:
         logger.error("An error occurred: %s", str(ex))
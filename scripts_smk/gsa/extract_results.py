@@ -6,15 +6,24 @@ Note that this script is directly implemented into the Snakemake
 workflow and pulls the arguments for the ``main()`` function directly from
 ``snakemake.input`` and ``snakemake.output[0]`` attributes on the snakemake
 object passed into this module at run time.
+
+With ``extract_all_results`` in config.yaml, all results of ``config/results.csv`` are
+extracted in one job per scenario (``main_all``). The files of the model runs are grouped
+by result file and each file is read once for all results extracted from it, e.g. the
+``AnnualShareOfProduction.csv`` of a model run for all the ``Share*`` results.
 """
 
+import os
+import numpy as np
 import pandas as pd
 from typing import List, Tuple, Dict
 from pathlib import Path
 from utils import get_model_run_scenario_from_filepath, parse_yaml
 import sys
-from utils import write_results, read_results
+from utils import write_results, read_results, read_store
 import itertools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import logging
 
@@ -48,9 +57,213 @@ def get_indices(parameters : pd.DataFrame, filename : str) -> Dict :
     indices = indices.to_dict()
     return {x:indices[x].split(',') for x in indices}
 
-def main(input_files: List, output_file: str, indices: Tuple, config: Dict):
+def get_result_index(param: str, config: Dict) -> Tuple[List, Dict]:
+    """Returns the index columns and their dtypes of a result file"""
+    if param not in config.keys(): #only works for AnnualShareOfProduction
+        if param == 'AnnualShareOfProduction':
+            df_index = ['REGION','TECHNOLOGY','YEAR','VALUE','absolute_production']
+        elif param == 'ProductionFromFuelCells':
+            df_index = ['REGION', 'TECHNOLOGY', 'FUEL', 'YEAR','VALUE']
+        else:
+            logging.warning(f"Unknown parameter {param}")
+            raise ValueError(f"Unknown parameter {param}")
+        #column_dtypes = (str, str, int, float, float)
+        column_dtypes = (str,str)
+    else:
+        df_index = config[param]['indices']
+        column_dtypes = {
+            x:config[x]['dtype'] for x in df_index
+        }
+    return df_index, column_dtypes
+
+def default_values(df: pd.DataFrame, index: Tuple, parameters: List[Tuple]) -> List[pd.DataFrame]:
+    """Populates a dataframe with zero values for each of the missing ``parameters``
+
+    Same as calling ``default_value_xs`` for each parameter, but the product of the unique
+    values of the other columns is built once for all parameters.
+    """
+    if not parameters:
+        return []
+    values = df.reset_index()
+    values = values.drop(columns="VALUE")
+    col_order = values.columns.to_list()
+    other_cols = [col for col in col_order if col not in index]
+    uniques = [values[col].unique() for col in other_cols]
+    if any(len(x) == 0 for x in uniques):
+        return [default_value_xs(df, index, x) for x in parameters]
+
+    # like DataFrame.explode, which turns the columns into object columns
+    if other_cols:
+        others = pd.MultiIndex.from_product(uniques).to_frame(index=False).astype(object)
+        others.columns = other_cols
+    else:
+        others = pd.DataFrame(index=range(1))
+    defaults = pd.concat([others] * len(parameters), ignore_index=True)
+    for i, name in enumerate(index):
+        defaults[name] = pd.Series(
+            [param[i] for param in parameters for _ in range(len(others))], dtype=object)
+    defaults["VALUE"] = 0
+    defaults = defaults.set_index(col_order)
+    return [defaults.iloc[i * len(others):(i + 1) * len(others)] for i in range(len(parameters))]
+
+def extract_model_run(df: pd.DataFrame, model_run: str, indices: Dict, df_index: List) -> pd.DataFrame:
+    """Extracts the defined results of a model run, indexed by MODELRUN and ``df_index``
+
+    The rows of all combinations of ``indices`` are selected with one lookup of the index
+    values in the combinations and ordered by combination, then by their order in ``df``, the
+    same as ``df.xs`` per combination. Like ``df.xs``, a combination with a value that is not
+    in ``df`` at all is filled with zeros (``default_values``), a combination of existing values
+    without rows is left out.
+    """
+    index = tuple(indices.keys())
+    parameters = list(itertools.product(*indices.values()))
+    combinations = pd.MultiIndex.from_tuples(parameters, names=index)
+    unique = combinations.unique()
+
+    if all(x in df.index.names for x in index):
+        levels = [df.index.get_level_values(x) for x in index]
+        keys = pd.MultiIndex.from_arrays(levels)
+        position = unique.get_indexer(keys)
+        found = [level.unique().get_indexer(pd.Index(values)) >= 0 for level, values in zip(levels, indices.values())]
+        missing = [not all(x) for x in itertools.product(*found)]
+    else: # like the KeyError of DataFrame.xs, all combinations are filled with zeros
+        position = np.full(len(df), -1)
+        missing = [True] * len(parameters)
+    selected = np.flatnonzero(position >= 0)
+    order = selected[np.argsort(position[selected], kind='stable')]
+    counts = np.bincount(position[selected], minlength=len(unique))
+
+    if combinations.is_unique and not any(missing):
+        results = df.iloc[order]
+    else:
+        # combinations filled with zeros or listed twice, concatenated in the order of the combinations
+        ends = np.cumsum(counts)
+        codes = unique.get_indexer(combinations)
+        defaults = default_values(df, index, [param for param, x in zip(parameters, missing) if x])
+        for param in (param for param, x in zip(parameters, missing) if x):
+            logging.warning(f"No values for {model_run} with {index} and {param}")
+        defaults = iter(defaults)
+        result_dfs = []
+        block = None # rows of consecutive combinations with values, selected at once
+        for code, x in zip(codes, missing):
+            if x:
+                if block is not None:
+                    result_dfs.append(df.iloc[order[block[0]:block[1]]])
+                    block = None
+                result_dfs.append(next(defaults))
+            elif block is not None and block[1] == ends[code] - counts[code]:
+                block[1] = ends[code]
+            else:
+                if block is not None:
+                    result_dfs.append(df.iloc[order[block[0]:block[1]]])
+                block = [ends[code] - counts[code], ends[code]]
+        if block is not None:
+            result_dfs.append(df.iloc[order[block[0]:block[1]]])
+        results = pd.concat(result_dfs)
+
+    results = results.reset_index(level='YEAR')
+    results['MODELRUN'] = model_run
+    return results.reset_index(
+        ).set_index(['MODELRUN'] + df_index)
+
+def extract_file(filename: str, targets: Dict[str, Dict], config: Dict) -> Dict[str, pd.DataFrame]:
+    """Reads a result file of a model run once and extracts the results of all ``targets``
+
+    Returns the extracted results by target, None if the file can not be read. A target that
+    can not be extracted is logged and left out, the other targets of the file are kept.
+    """
+    try:
+        bits = get_model_run_scenario_from_filepath(filename)
+        logging.info(f"Extracting results for {filename}")
+        logging.info({bits['param']})
+        df_index, column_dtypes = get_result_index(bits['param'], config)
+        #logging.info(f"Using {df_index} with {column_dtypes}")
+        df = read_results(filename)
+        df = df.astype(column_dtypes).set_index(df_index)
+    except Exception as ex:
+        logging.exception(f"Exception: {ex} for {filename}")
+        return None
+    return extract_targets(df, bits['model_run'], targets, df_index, filename)
+
+def extract_targets(df: pd.DataFrame, model_run: str, targets: Dict[str, Dict], df_index: List,
+                    source: str) -> Dict[str, pd.DataFrame]:
+    """Extracts the results of all ``targets`` from the results of a model run
+
+    A target that can not be extracted is logged and left out
+    """
+    extracted = {}
+    for name, indices in targets.items():
+        try:
+            extracted[name] = extract_model_run(df, model_run, indices, df_index)
+        except Exception as ex:
+            logging.exception(f"Exception: {ex} for {name} from {source}")
+    return extracted
+
+def extract_files(input_files: List, file_targets: List[Dict[str, Dict]], config: Dict,
+                  processes: int = 1) -> Dict[str, List[pd.DataFrame]]:
+    """Extracts the targets of each input file, the files are read by ``processes`` worker processes
+
+    Returns the extracted results of each target in the order of ``input_files``
+    """
+    if processes > 1 and len(input_files) > 1:
+        chunksize = max(1, len(input_files) // (4 * processes))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(extract_file, input_files, file_targets, repeat(config),
+                                        chunksize=chunksize))
+    else:
+        results = [extract_file(filename, targets, config)
+                   for filename, targets in zip(input_files, file_targets)]
+
+    extracted = {name: [] for targets in file_targets for name in targets}
+    for result in results:
+        for name, df in (result or {}).items():
+            extracted[name].append(df)
+    return extracted
+
+def extract_store(input_files: List, targets: Dict[str, Dict], config: Dict) -> Dict[str, List[pd.DataFrame]]:
+    """Extracts the targets of all model runs of a result in the results store
+
+    The files of a result in the store, ``results/{scenario}/store/{result}/{model_run}.parquet``,
+    are read at once as one parquet dataset instead of one file per model run.
+
+    Returns the extracted results of each target in the order of ``input_files``. Like for the
+    csv files, a model run that can not be read or a target that can not be extracted is logged
+    and left out.
+    """
+    result_folder = os.path.dirname(input_files[0])
+    param = os.path.basename(result_folder)
+    model_runs = [Path(x).stem for x in input_files]
+    logging.info(f"Extracting results for {len(model_runs)} model runs from {result_folder}")
+
+    df_index, column_dtypes = get_result_index(param, config)
+    data = read_store(result_folder, model_runs)
+    model_run_data = dict(tuple(data.groupby('MODELRUN', sort=False)))
+
+    extracted = {name: [] for name in targets}
+    for model_run in model_runs:
+        source = os.path.join(result_folder, f"{model_run}.parquet")
+        try:
+            df = model_run_data[model_run].drop(columns='MODELRUN').reset_index(drop=True)
+            if isinstance(column_dtypes, dict): # the results of calc_result_variables keep their parquet dtypes
+                df = df.astype(column_dtypes)
+            df = df.set_index(df_index)
+        except Exception as ex:
+            logging.exception(f"Exception: {ex} for {source}")
+            continue
+        for name, df_target in extract_targets(df, model_run, targets, df_index, source).items():
+            extracted[name].append(df_target)
+    return extracted
+
+def is_store(input_files: List) -> bool:
+    """True if the input files are files of the results store"""
+    return all(x.endswith('.parquet') and '/store/' in Path(x).as_posix() for x in input_files)
+
+def main(input_files: List, output_file: str, indices: Tuple, config: Dict, processes: int = 1):
     """Iterate over list of CSV files, extract defined results, write to output file.
 
+    The files are read and filtered by a pool of ``processes`` worker processes, the results
+    of all model runs are concatenated in the order of ``input_files`` and written once.
+
     Parameters
     ----------
     input_files : List
@@ -62,74 +275,109 @@ def main(input_files: List, output_file: str, indices: Tuple, config: Dict):
         ex. {'REGION':['SIMPLICITY], 'TECHNOLOGY':['GAS_EXTRACTION','HYD1']}
     config : Dict
         otoole configuration file
+    processes : int, default=1
+        Number of worker processes
     """
-    aggregated_results = []
-    for filename in input_files:
-        try:
-            bits = get_model_run_scenario_from_filepath(filename)
-            logging.info(f"Extracting results for {filename}")
-            logging.info({bits['param']})
-            if bits['param'] not in config.keys(): #only works for AnnualShareOfProduction
-                if bits['param'] == 'AnnualShareOfProduction':
-                    df_index = ['REGION','TECHNOLOGY','YEAR','VALUE','absolute_production']
-                elif bits['param'] == 'ProductionFromFuelCells':
-                    df_index = ['REGION', 'TECHNOLOGY', 'FUEL', 'YEAR','VALUE']
-                else:
-                    logging.warning(f"Unknown parameter {bits['param']}")
-                    raise ValueError(f"Unknown parameter {bits['param']}")
-                #column_dtypes = (str, str, int, float, float)
-                column_dtypes = (str,str)
-            else:
-                df_index = config[bits['param']]['indices']
-                column_dtypes = {
-                    x:config[x]['dtype'] for x in df_index
-                }
-            #logging.info(f"Using {df_index} with {column_dtypes}")
-            df = read_results(filename)
-            df = df.astype(column_dtypes).set_index(df_index)
-            ################################################################
-            # this method of slicing and then appending is super enefficient... 
-            # will revist to speed this up 
-            result_dfs = []
-            parameters = tuple(itertools.product(*indices.values()))
-            indices_expanded = tuple([tuple(indices.keys())] * len(parameters))
-            for index, param in zip(indices_expanded, parameters):
-                try:
-                    results = df.xs(param, level=index, drop_level=False)
-                    result_dfs.append(results)
-                except KeyError as ex:
-                    logging.warning(f"KeyError: {ex} for {filename} with {index} and {param}")
-                    results = default_value_xs(df, index, param)
-                    result_dfs.append(results)
-
-            results = pd.concat(result_dfs)
-            results = results.reset_index(level='YEAR')
-            ################################################################
-            results['MODELRUN'] = bits['model_run']
-            results = results.reset_index(
-                ).set_index(['MODELRUN'] + df_index)
-            aggregated_results.append(results)
-        except Exception as ex:
-            logging.exception(f"Exception: {ex} for {filename} with {index} and {param}")
+    targets = {output_file: indices}
+    aggregated_results = extract_files(input_files, [targets] * len(input_files), config, processes)[output_file]
+    if not aggregated_results:
+        raise ValueError(f"No results could be extracted from {len(input_files)} files")
+    write_results(pd.concat(aggregated_results), output_file, True)
 
-        results = pd.concat(aggregated_results)
-        write_results(results, output_file, True)
+def main_store(input_files: List, output_file: str, indices: Dict, config: Dict):
+    """Extracts the defined results of all model runs from the results store of the scenario
+
+    Parameters
+    ----------
+    input_files : List
+        Store files of the result, one per model run
+    output_file : str
+        Name of output file
+    indices : Dict
+        Indices to extract value over 
+    config : Dict
+        otoole configuration file
+    """
+    aggregated_results = extract_store(input_files, {output_file: indices}, config)[output_file]
+    if not aggregated_results:
+        raise ValueError(f"No results could be extracted from {len(input_files)} files")
+    write_results(pd.concat(aggregated_results), output_file, True)
+
+def main_all(input_files: List, output_files: Dict[str, str], targets: Dict[str, Tuple[str, Dict]],
+             config: Dict, processes: int = 1):
+    """Extracts all results of ``config/results.csv`` with one read of each result file
+
+    The input files are grouped by result file, e.g. ``AnnualShareOfProduction``, and each
+    file of a model run is read once for all results extracted from it.
+
+    Parameters
+    ----------
+    input_files : List
+        Result files of all model runs, CSVs or files of the results store
+    output_files : Dict[str, str]
+        Output file of each result, by the filename in ``config/results.csv``
+    targets : Dict[str, Tuple[str, Dict]]
+        Result file and indices of each result, by the filename in ``config/results.csv``
+        ex. {'ShareRenewables': ('AnnualShareOfProduction', {'REGION':['REGION1'], 'TECHNOLOGY':['ELRENEW']})}
+    config : Dict
+        otoole configuration file
+    processes : int, default=1
+        Number of worker processes
+    """
+    result_targets = {}
+    for name, (resultfile, indices) in targets.items():
+        result_targets.setdefault(resultfile, {})[name] = indices
+
+    aggregated_results = {name: [] for name in targets}
+    if is_store(input_files):
+        result_files = {}
+        for filename in input_files:
+            result_files.setdefault(os.path.basename(os.path.dirname(filename)), []).append(filename)
+        for resultfile, files in result_files.items():
+            for name, dfs in extract_store(files, result_targets.get(resultfile, {}), config).items():
+                aggregated_results[name].extend(dfs)
+    else:
+        file_targets = [result_targets.get(Path(x).stem, {}) for x in input_files]
+        for name, dfs in extract_files(input_files, file_targets, config, processes).items():
+            aggregated_results[name].extend(dfs)
+
+    for name, output_file in output_files.items():
+        if not aggregated_results[name]:
+            raise ValueError(f"No results could be extracted for {name} from {targets[name][0]}")
+        write_results(pd.concat(aggregated_results[name]), output_file, True)
        
 
 if __name__ == '__main__':
 
+    targets = None
     if "snakemake" in globals():
         input_files = snakemake.input['csvs']
         yaml_config = snakemake.input['config']
-        output_file_path = snakemake.output[0]
-        indices = snakemake.params['parameter']
+        processes = snakemake.threads
+        if 'targets' in snakemake.params.keys(): # extract_all_results, one output per result file name
+            targets = snakemake.params['targets']
+            output_files = dict(zip(targets, snakemake.output))
+        else:
+            output_file_path = snakemake.output[0]
+            indices = snakemake.params['parameter']
         # Get the log file path from Snakemake
         log_file_path = snakemake.log[0]
         logging.basicConfig(filename=log_file_path, level=logging.INFO)
+    elif len(sys.argv) in (6, 7) and sys.argv[1] == 'all':
+        results_folder = sys.argv[2]
+        yaml_config = sys.argv[3]
+        parameters = pd.read_csv(sys.argv[4])
+        targets = {x: (y, get_indices(parameters, x)) for x, y in zip(parameters['filename'], parameters['resultfile'])}
+        output_files = {x: os.path.join(sys.argv[5], f"{x}.csv") for x in targets}
+        os.makedirs(sys.argv[5], exist_ok=True)
+        model_runs = sorted(Path(results_folder).glob('model_*'), key=lambda x: int(x.name.split('_')[-1]))
+        input_files = [str(x / 'results' / f"{y}.csv") for y in sorted(set(parameters['resultfile'])) for x in model_runs]
+        processes = int(sys.argv[6]) if len(sys.argv) == 7 else 1
     else:
-        if len(sys.argv) != 5:
+        if len(sys.argv) not in (5, 6):
             raise ValueError(
-                "Usage: python extract_results.py <input_csvs> <user_config> <output_file> <result_parameters>"
+                "Usage: python extract_results.py <input_csvs> <user_config> <output_file> <result_parameters> [<processes>]\n"
+                "       python extract_results.py all <results_folder> <user_config> <result_parameters> <output_folder> [<processes>]"
             )
         input_files = sys.argv[1]
         if not isinstance(input_files, list):
@@ -139,13 +387,20 @@ if __name__ == '__main__':
         parameters = pd.read_csv(sys.argv[4])
         output_file = Path(sys.argv[3]).stem
         indices = get_indices(parameters, output_file)
+        processes = int(sys.argv[5]) if len(sys.argv) == 6 else 1
 
-    if 'YEAR' in indices:
-        indices['YEAR'] = [float(x) for x in indices['YEAR']]
+    for _, x in (targets.values() if targets is not None else [(None, indices)]):
+        if 'YEAR' in x:
+            x['YEAR'] = [float(year) for year in x['YEAR']]
     logging.info("Extracting results")
     try:       
         user_config = parse_yaml(yaml_config)
-        main(input_files, output_file_path, indices, user_config)
+        if targets is not None:
+            main_all(input_files, output_files, targets, user_config, processes)
+        elif is_store(input_files):
+            main_store(input_files, output_file_path, indices, user_config)
+        else:
+            main(input_files, output_file_path, indices, user_config, processes)
     except Exception as ex:
-        logging.exception(f"Exception: {ex} for {input_files} with {indices}")
-        raise ex
\ No newline at end of file
+        logging.exception(f"Exception: {ex} for {input_files} with {targets if targets is not None else indices}")
+        raise ex
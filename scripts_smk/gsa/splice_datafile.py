@@ -0,0 +1,183 @@
+"""Creates the datafile of a model run by splicing sampled values into the scenario datafile
+
+Arguments
+---------
+<base_datafile>
+    Path to the otoole datafile of the scenario, i.e. the converted master model csv directory
+<years_filepath>
+    Path to the ``YEAR.csv`` file of the master model csv directory
+<sample_filepath>
+    Path the sample file
+<user_config>
+    Path to the otoole configuration file
+<output_datafile>
+    Path to the datafile of the model run
+
+Instead of rewriting all csv files of a model run and converting them with otoole,
+the scenario datafile is converted once and copied line by line for every model run.
+Only the entries of the ``param`` blocks listed in the sample file are replaced, entries
+that are missing in the scenario datafile are added at the end of their block. Like
+otoole, values equal to the default of a parameter are omitted and values are written
+with the ``%g`` format.
+
+GLPK does not accept a second data block for a parameter, so the sampled values can't
+be passed as an additional ``-d`` file and are spliced in instead.
+
+To run this script on the command line, use the following::
+
+    python splice_datafile.py <base_datafile> <years_filepath> <sample_filepath> <user_config> <output_datafile>
+
+"""
+import csv
+import os
+import sys
+from typing import Dict, List, Tuple, Union
+
+import pandas as pd
+from otoole.read_strategies import ReadCsv
+from otoole.utils import _read_file
+
+from create_modelrun import apply_interpolation_action, get_types_from_tuple
+
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,  # Set the logging level to INFO
+    handlers=[logging.StreamHandler(sys.stdout)]  # Write logs to stdout
+)
+logger = logging.getLogger(__name__)
+
+
+def get_delta(
+        parameters: List[Dict[str, Union[str, int, float]]],
+        first_year: int,
+        end_year: int,
+        config: Dict) -> Dict[str, Dict[Tuple, float]]:
+    """Computes the sampled values of a model run
+
+    Applies the same actions and interpolation as ``create_modelrun.modify_parameters``,
+    later rows of the sample overwrite earlier ones.
+
+    Parameters
+    ----------
+    parameters : List[Dict[str, Union[str, int, float]]]
+        Flattened input parameters for the individual model run
+    first_year : int
+        First year of the model
+    end_year : int
+        Last year of the model
+    config : Dict
+        Input configuration file
+
+    Returns
+    -------
+    delta : Dict[str, Dict[Tuple, float]]
+        New values by OSeMOSYS parameter, keyed by the index as written in the datafile
+    """
+    delta = {}
+    for parameter in parameters:
+        name = parameter['name']
+        untyped_index = parameter['indexes'].split(",")
+        index = tuple(str(x) for x in get_types_from_tuple(untyped_index, name, config))
+        inter_index = parameter['interpolation_index']
+
+        new_values = apply_interpolation_action(parameter['action'], inter_index,
+            float(parameter['value_base_year']), float(parameter['value_end_year']),
+            first_year, end_year)
+
+        values = delta.setdefault(name, {})
+        if inter_index == 'YEAR':
+            for year, value in zip(range(first_year, end_year + 1), new_values.flatten()):
+                values[index + (str(year),)] = float(value)
+        else:
+            values[index] = float(new_values[0])
+    return delta
+
+
+def format_entry(index: Tuple, value: float) -> str:
+    """Formats a parameter entry like otoole"""
+    return " ".join(index) + " " + "%g" % value + "\n"
+
+
+def splice_datafile(base_datafile: str, output_datafile: str, delta: Dict[str, Dict[Tuple, float]]):
+    """Copies the datafile and replaces the entries in ``delta``
+
+    Parameters
+    ----------
+    base_datafile : str
+        Path to the otoole datafile of the scenario
+    output_datafile : str
+        Path to the datafile of the model run
+    delta : Dict[str, Dict[Tuple, float]]
+        New values by OSeMOSYS parameter
+
+    Raises
+    ------
+    ValueError
+        If a parameter of ``delta`` has no block in the datafile
+    """
+    found = set()
+    block = None
+    default = None
+
+    with open(base_datafile, 'r') as f, open(output_datafile, 'w') as file_out:
+        for line in f:
+            if block is not None:
+                if line.startswith(';'):
+                    # Entries missing in the base datafile are at their default value there
+                    for index, value in block.items():
+                        if value != default:
+                            file_out.write(format_entry(index, value))
+                    block = None
+                else:
+                    index = tuple(line.split()[:-1])
+                    if index in block:
+                        value = block.pop(index)
+                        if value != default:
+                            file_out.write(format_entry(index, value))
+                        continue
+
+            file_out.write(line)
+
+            if line.startswith('param'):
+                # param default <default> : <name> :=
+                details = line.split()
+                if details[4] in delta:
+                    found.add(details[4])
+                    block = dict(delta[details[4]])
+                    default = float(details[2])
+
+    missing = set(delta) - found
+    if missing:
+        logger.error(f"No data block found for {sorted(missing)} in {base_datafile}")
+        raise ValueError(f"No data block found for {sorted(missing)} in {base_datafile}")
+
+
+def main(
+    base_datafile: str,
+    years_filepath: str,
+    output_datafile: str,
+    parameters: List[Dict[str, Union[str, int, float]]],
+    user_config: Dict):
+
+    user_config = ReadCsv(user_config=user_config).user_config # adds the index dtypes of the parameters
+    years = pd.read_csv(years_filepath)['VALUE']
+    delta = get_delta(parameters, int(years.min()), int(years.max()), user_config)
+    logger.info("Splicing {} values of {} parameters into {}".format(
+        sum(len(x) for x in delta.values()), len(delta), output_datafile))
+    splice_datafile(base_datafile, output_datafile, delta)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 6:
+        print("Usage: python splice_datafile.py <base_datafile> <years_filepath> <sample_filepath> <user_config> <output_datafile>")
+        sys.exit(1)
+    else:
+        with open(sys.argv[3], 'r') as csv_file:
+            sample = list(csv.DictReader(csv_file))
+
+        _, ending = os.path.splitext(sys.argv[4])
+        with open(sys.argv[4], "r") as f:
+            user_config = _read_file(f, ending)
+
+        main(sys.argv[1], sys.argv[2], sys.argv[5], sample, user_config)
@@ -46,6 +46,8 @@ def read_results(input_filepath: str) -> pd.DataFrame:
     extension = os.path.splitext(input_filepath)[1]
     if extension == '.parquet':
         df = pd.read_parquet(input_filepath)
+        if any(df.index.names): # written with the index, like the csv files
+            df = df.reset_index()
     elif extension == '.csv':
         df = pd.read_csv(input_filepath)
     elif extension == '.feather':
@@ -53,6 +55,28 @@ def read_results(input_filepath: str) -> pd.DataFrame:
     return df
 
 
+def read_store(result_folder: str, model_runs: List[str] = None) -> pd.DataFrame:
+    """Reads a result of the results store of a scenario
+
+    The results store holds one parquet file per result and model run, i.e.
+    ``results/{scenario}/store/{result}/{model_run}.parquet``, each with a ``MODELRUN`` column.
+
+    Arguments
+    ---------
+    result_folder: str
+        Path to the folder of the result in the store
+    model_runs: List[str] = None
+        Model runs to read, e.g. ['model_0', 'model_1'], all model runs if None
+
+    Returns
+    -------
+    pd.DataFrame
+        Values of all model runs with the ``MODELRUN`` column
+    """
+    filters = [('MODELRUN', 'in', list(model_runs))] if model_runs is not None else None
+    return pd.read_parquet(result_folder, filters=filters)
+
+
 def write_results(df: pd.DataFrame, output_filepath: str, index=None) -> None:
     """Write out aggregated results to disk by scenario 
 
@@ -1,6 +1,7 @@
+import csv
+import glob
 import json
 import shutil
-import gzip
 
 wildcard_constraints: #one or more digits for each wildcard
     modelrun=r"\d+",
@@ -12,26 +13,47 @@ def csv_from_scenario(wildcards): #returns the input csv folder for the scenario
 def config_from_scenario(wildcards): #returns the config file for the scenario (config/otoole.yaml)
     return SCENARIOS.loc[int(wildcards.scenario), 'config']
 
-rule create_model_data: 
-    message: "Copying and modifying data for '{params.folder}'"
-    input:
-        csv=csv_from_scenario,
-        sample="modelruns/{scenario}/model_{model_run}/sample_{model_run}.txt",
-        config=config_from_scenario
-    log: "log/create_modelrun/create_model_data_{scenario}_{model_run}.log"
-    params:
-        folder=directory("results/{scenario}/model_{model_run}/data"),
-    conda: "../envs/otoole_env.yaml"
-    output:
-        csvs = expand("results/{{scenario}}/model_{{model_run}}/data/{x}.csv", x=INPUT_FILES)
-    shell:
-        "python scripts_smk/gsa/create_modelrun.py {input.csv} {params.folder} {input.sample} {input.config} > {log} 2>&1"
+if config.get('batch_modelruns', False):
+    rule create_model_data: #creates all model runs of a scenario in one job, the baseline is read once
+        message: "Copying and modifying data for the model runs of scenario '{wildcards.scenario}'"
+        input:
+            csv=csv_from_scenario,
+            sample="modelruns/{scenario}/morris_sample.txt",
+            parameters=config['parameters'],
+            config=config_from_scenario
+        log: "log/create_modelrun/create_model_data_{scenario}.log"
+        params:
+            folder="results/{scenario}",
+        threads:
+            config.get('batch_processes', 1)
+        conda: "../envs/otoole_env.yaml"
+        output:
+            csvs = expand("results/{{scenario}}/model_{model_run}/data/{x}.csv", model_run=MODELRUNS, x=INPUT_FILES)
+        shell:
+            "python scripts_smk/gsa/create_modelrun.py --batch {input.csv} {params.folder} {input.sample} {input.parameters} {input.config} {threads} > {log} 2>&1"
+
+else:
+    rule create_model_data: 
+        message: "Copying and modifying data for '{params.folder}'"
+        input:
+            csv=csv_from_scenario,
+            sample="modelruns/{scenario}/model_{model_run}/sample_{model_run}.txt",
+            config=config_from_scenario
+        log: "log/create_modelrun/create_model_data_{scenario}_{model_run}.log"
+        params:
+            folder=directory("results/{scenario}/model_{model_run}/data"),
+            cache=config.get('baseline_cache', 'temp/baseline_cache'),
+        conda: "../envs/otoole_env.yaml"
+        output:
+            csvs = expand("results/{{scenario}}/model_{{model_run}}/data/{x}.csv", x=INPUT_FILES)
+        shell:
+            "python scripts_smk/gsa/create_modelrun.py {input.csv} {params.folder} {input.sample} {input.config} {params.cache} > {log} 2>&1"
 
 rule copy_otoole_config:
     message: "Copying otoole configuration file for '{params.folder}'"
     input:
         yaml=config_from_scenario,
-        csvs=rules.create_model_data.output
+        csvs=expand("results/{{scenario}}/model_{{model_run}}/data/{x}.csv", x=INPUT_FILES)
     params:
         folder="results/{scenario}/model_{model_run}",
     output:
@@ -39,41 +61,102 @@ rule copy_otoole_config:
     run:
         shutil.copy(input.yaml, output.yaml)
 
-rule generate_datafile: #=convert_dp
-    message: "Generating datafile for '{output}'"
-    input:
-        csv = rules.create_model_data.output,
-        config="results/{scenario}/model_{model_run}/config.yaml"
-    output:
-        datafile = temp("temp/{scenario}/model_{model_run}.txt")
-    params:
-        csv_dir = "results/{scenario}/model_{model_run}/data"
-    conda: "../envs/otoole_env.yaml"
-    log:
-        "log/generate_datafile/otoole_{scenario}_{model_run}.log"
-    shell:
-        "otoole -v convert csv datafile {params.csv_dir} {output.datafile} {input.config} > {log} 2>&1"
+if config.get('delta_datafile', False):
+    rule generate_base_datafile: #converts the scenario data once, the model runs only change the sampled entries
+        message: "Generating base datafile for scenario '{wildcards.scenario}'"
+        input:
+            csv=csv_from_scenario,
+            config=config_from_scenario
+        output:
+            datafile = temp("temp/{scenario}/base.txt")
+        conda: "../envs/otoole_env.yaml"
+        log:
+            "log/generate_datafile/otoole_{scenario}_base.log"
+        shell:
+            "otoole -v convert csv datafile {input.csv} {output.datafile} {input.config} > {log} 2>&1"
+
+    rule generate_datafile: #splices the sampled values into the base datafile
+        message: "Generating datafile for '{output}'"
+        input:
+            base="temp/{scenario}/base.txt",
+            csv=csv_from_scenario,
+            sample="modelruns/{scenario}/model_{model_run}/sample_{model_run}.txt",
+            config=config_from_scenario
+        output:
+            datafile = temp("temp/{scenario}/model_{model_run}.txt")
+        conda: "../envs/otoole_env.yaml"
+        log:
+            "log/generate_datafile/splice_{scenario}_{model_run}.log"
+        shell:
+            "python scripts_smk/gsa/splice_datafile.py {input.base} {input.csv}/YEAR.csv {input.sample} {input.config} {output.datafile} > {log} 2>&1"
+
+else:
+    rule generate_datafile: #=convert_dp
+        message: "Generating datafile for '{output}'"
+        input:
+            csv = expand("results/{{scenario}}/model_{{model_run}}/data/{x}.csv", x=INPUT_FILES),
+            config="results/{scenario}/model_{model_run}/config.yaml"
+        output:
+            datafile = temp("temp/{scenario}/model_{model_run}.txt")
+        params:
+            csv_dir = "results/{scenario}/model_{model_run}/data"
+        conda: "../envs/otoole_env.yaml"
+        log:
+            "log/generate_datafile/otoole_{scenario}_{model_run}.log"
+        shell:
+            "otoole -v convert csv datafile {params.csv_dir} {output.datafile} {input.config} > {log} 2>&1"
+
+def modex_input(wildcards): #csv files if the MODEx sets are computed from the data package, otherwise the datafile
+    if config.get('modex_from_csv', False):
+        return expand("results/{scenario}/model_{model_run}/data/{x}.csv", x=INPUT_FILES, scenario=wildcards.scenario, model_run=wildcards.model_run)
+    return f"temp/{wildcards.scenario}/model_{wildcards.model_run}.txt"
+
+def lp_data_files(wildcards): #the datafile is passed separately to glpsol if the modex file only holds the MODEx sets
+    modex_file = f"temp/{wildcards.scenario}/model_{wildcards.model_run}_modex.txt"
+    if config.get('modex_from_csv', False):
+        return [f"temp/{wildcards.scenario}/model_{wildcards.model_run}.txt", modex_file]
+    return [modex_file]
 
 rule modify_model_file: #pre_processing of the model file
     message: "Adding MODEX sets to model file"
     input:
-        "temp/{scenario}/model_{model_run}.txt"
+        modex_input
     output:
         temp("temp/{scenario}/model_{model_run}_modex.txt")
+    params:
+        data_format = 'csv' if config.get('modex_from_csv', False) else 'otoole',
+        source = lambda wildcards, input: f"results/{wildcards.scenario}/model_{wildcards.model_run}/data" if config.get('modex_from_csv', False) else input[0]
     threads:
         1
     conda: "../envs/otoole_env.yaml"
     shell:
-        "python scripts_smk/pre_process.py otoole {input} {output}"
+        "python scripts_smk/pre_process.py {params.data_format} {params.source} {output}"
+
+def benchmark_mem_mb(stage, default): #memory request from the peak memory of earlier runs of the scenario in benchmarks/{stage}
+    def mem_mb(wildcards, attempt):
+        peak = []
+        for filepath in glob.glob(f"benchmarks/{stage}/{wildcards.scenario}_*.tsv"):
+            with open(filepath, 'r') as f:
+                for row in csv.DictReader(f, delimiter='\t'):
+                    try:
+                        peak.append(float(row['max_rss']))
+                    except (KeyError, TypeError, ValueError): #max_rss is NA for very short jobs
+                        pass
+        if not peak:
+            return default * attempt
+        return int(max(peak) * config.get('mem_headroom', 1.2) * attempt)
+    return mem_mb
 
 rule generate_lp_file:
     priority: 0
     message: "Generating the LP file for '{output}'"
     input:
-        data="temp/{scenario}/model_{model_run}_modex.txt",
+        data=lp_data_files,
         model=config['model_file']
+    params:
+        data_args = lambda wildcards, input: " ".join("-d " + x for x in input.data)
     resources:
-        mem_mb=64000,
+        mem_mb=benchmark_mem_mb('gen_lp', 64000),
         disk_mb=16000,
         time=180
     threads:
@@ -86,56 +169,113 @@ rule generate_lp_file:
         "log/generate_lp_file/glpsol_{scenario}_{model_run}.log"
     conda: "../envs/otoole_env.yaml"
     shell:
-        "glpsol -m {input.model} -d {input.data} --wlp {output} --check > {log} 2>&1"
+        "glpsol -m {input.model} {params.data_args} --wlp {output} --check > {log} 2>&1"
 
-rule unzip_lp:
-    priority: 0
-    message: "Unzipping LP file"
-    input:
-        "temp/{scenario}/model_{model_run}.lp.gz"
-    output:
-        temp("temp/{scenario}/model_{model_run}.lp")
-    run:
-        with gzip.open(input[0], 'rb') as f_in:
-            with open(output[0], 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
+def warm_start_input(wildcards): #the previous model run of the Morris trajectory provides the starting basis, the first run of a trajectory is solved from scratch
+    files = {'lp': f"temp/{wildcards.scenario}/model_{wildcards.model_run}.lp{ZIP}"}
+    model_run = int(wildcards.model_run)
+    if model_run % (len(GROUPS) + 1) != 0:
+        folder = f"results/{wildcards.scenario}/model_{model_run - 1}"
+        files['basis'] = f"{folder}/model_{model_run - 1}.bas"
+        files['signature'] = f"{folder}/model_{model_run - 1}_signature.json"
+    return files
 
-rule solve_lp:
-    priority: 100
-    message: "Solving the LP for '{output}' using {config[solver]}"
-    input:
-        "temp/{scenario}/model_{model_run}.lp"
-    output:
-        temp(expand("results/{{scenario}}/model_{{model_run}}/model_{{model_run}}.sol")) #the temp can be removed if needed for debugging
-    log:
-        "log/solve_lp/solver_{scenario}_{model_run}.log"
-    conda:
-        "../envs/gurobi_env.yaml"
-    resources:
-        mem_mb=30000,
-        disk_mb=20000,
-        time=720
-    threads:
-        4
-    script:
-        "run.py"        
+#a job waiting for the solve worker only uses a few MB, so it is benchmarked apart from the jobs running the solver
+SOLVE_BENCHMARK = "benchmarks/solve_lp_wait/{scenario}_{model_run}.tsv" if config.get('solve_worker') else "benchmarks/solve_lp/{scenario}_{model_run}.tsv"
 
-rule process_solution:
-    priority: 100
-    message: "Processing {config[solver]} solution for model run {wildcards.model_run}"
-    input:
-        solution="results/{scenario}/model_{model_run}/model_{model_run}.sol",
-        config="results/{scenario}/model_{model_run}/config.yaml",
-    output: 
-        expand("results/{{scenario}}/model_{{model_run}}/results/{csv}.csv", csv=OUTPUT_FILES),
-        "results/{scenario}/model_{model_run}/res-csv_done.txt" #tells when it was executed
-    conda: "../envs/otoole_env.yaml"
-    log: "log/process_solution/process_solution_{scenario}_{model_run}.log"
-    params:        
-        input_folder= "results/{scenario}/model_{model_run}/data",
-        folder="results/{scenario}/model_{model_run}/results"
-    shell: 
-        "python scripts_smk/convert.py {input.config} {input.solution} {params.folder} {params.input_folder} > {log} 2>&1"
+if config.get('warm_start', False):
+    rule solve_lp:
+        priority: 100
+        message: "Solving the LP for '{output.sol}' using {config[solver]}"
+        input:
+            unpack(warm_start_input)
+        output:
+            sol=temp("results/{scenario}/model_{model_run}/model_{model_run}.sol"),
+            basis=temp("results/{scenario}/model_{model_run}/model_{model_run}.bas"),
+            signature=temp("results/{scenario}/model_{model_run}/model_{model_run}_signature.json")
+        benchmark:
+            SOLVE_BENCHMARK
+        log:
+            "log/solve_lp/solver_{scenario}_{model_run}.log"
+        conda:
+            "../envs/gurobi_env.yaml"
+        params:
+            spool=config.get('solve_worker', ''),
+            duals=config.get('duals', []),
+            dual_folder="results/{scenario}/model_{model_run}/duals"
+        resources:
+            mem_mb=benchmark_mem_mb('solve_lp', 30000) if not config.get('solve_worker') else 1000, #the job only waits for the worker
+            disk_mb=20000,
+            time=720
+        threads:
+            4 if not config.get('solve_worker') else 1
+        script:
+            "run.py"
+
+else:
+    rule solve_lp:
+        priority: 100
+        message: "Solving the LP for '{output}' using {config[solver]}"
+        input:
+            expand("temp/{{scenario}}/model_{{model_run}}.lp{zip_extension}", zip_extension=ZIP) #gurobi reads the compressed lp file directly
+        output:
+            temp(expand("results/{{scenario}}/model_{{model_run}}/model_{{model_run}}.sol")) #the temp can be removed if needed for debugging
+        benchmark:
+            SOLVE_BENCHMARK
+        log:
+            "log/solve_lp/solver_{scenario}_{model_run}.log"
+        conda:
+            "../envs/gurobi_env.yaml"
+        params:
+            spool=config.get('solve_worker', ''),
+            duals=config.get('duals', []),
+            dual_folder="results/{scenario}/model_{model_run}/duals"
+        resources:
+            mem_mb=benchmark_mem_mb('solve_lp', 30000) if not config.get('solve_worker') else 1000, #the job only waits for the worker
+            disk_mb=20000,
+            time=720
+        threads:
+            4 if not config.get('solve_worker') else 1
+        script:
+            "run.py"        
+
+if config.get('results_store', False):
+    rule process_solution: #adds the results of the model run to the results store of the scenario
+        priority: 100
+        message: "Processing {config[solver]} solution for model run {wildcards.model_run}"
+        input:
+            solution="results/{scenario}/model_{model_run}/model_{model_run}.sol",
+            config="results/{scenario}/model_{model_run}/config.yaml",
+        output: 
+            expand("results/{{scenario}}/store/{result}/model_{{model_run}}.parquet", result=OUTPUT_FILES),
+            "results/{scenario}/model_{model_run}/res-csv_done.txt" #tells when it was executed
+        conda: "../envs/otoole_env.yaml"
+        log: "log/process_solution/process_solution_{scenario}_{model_run}.log"
+        params:        
+            input_folder= "results/{scenario}/model_{model_run}/data",
+            store="results/{scenario}/store",
+            results=",".join(OUTPUT_FILES)
+        shell: 
+            "python scripts_smk/convert_sol.py {input.config} {input.solution} {params.store} {params.input_folder} store {params.results} > {log} 2>&1"
+else:
+    rule process_solution:
+        priority: 100
+        message: "Processing {config[solver]} solution for model run {wildcards.model_run}"
+        input:
+            solution="results/{scenario}/model_{model_run}/model_{model_run}.sol",
+            config="results/{scenario}/model_{model_run}/config.yaml",
+        output: 
+            expand("results/{{scenario}}/model_{{model_run}}/results/{csv}.csv", csv=OUTPUT_FILES),
+            "results/{scenario}/model_{model_run}/res-csv_done.txt" #tells when it was executed
+        conda: "../envs/otoole_env.yaml"
+        log: "log/process_solution/process_solution_{scenario}_{model_run}.log"
+        params:        
+            input_folder= "results/{scenario}/model_{model_run}/data",
+            folder="results/{scenario}/model_{model_run}/results",
+            script="scripts_smk/convert_sol.py" if config.get('convert_sol', False) or config.get('selective_results', False) else "scripts_smk/convert.py", #convert_sol.py reads the solution file without otoole.convert_results
+            results="csv " + ",".join(OUTPUT_FILES) if config.get('selective_results', False) else "" #convert_sol.py only writes these results
+        shell: 
+            "python {params.script} {input.config} {input.solution} {params.folder} {params.input_folder} {params.results} > {log} 2>&1"
    
 rule get_statistics:
     priority: 100
@@ -152,12 +292,23 @@ rule get_objective_value:
     script:
         "gsa/get_objective_value.py"
 
-rule calc_result_variables:
-    priority: 100
-    input: "results/{scenario}/model_{model_run}/res-csv_done.txt"
-    params: "results/{scenario}/model_{model_run}/results"
-    output: 
-        "results/{scenario}/model_{model_run}/results/AnnualShareOfProduction.csv",
-        "results/{scenario}/model_{model_run}/results/ProductionFromFuelCells.csv"
-    script:
-        "calc_result_variables.py"
\ No newline at end of file
+if config.get('results_store', False):
+    rule calc_result_variables:
+        priority: 100
+        input: "results/{scenario}/model_{model_run}/res-csv_done.txt"
+        params: "results/{scenario}/store", "model_{model_run}"
+        output: 
+            "results/{scenario}/store/AnnualShareOfProduction/model_{model_run}.parquet",
+            "results/{scenario}/store/ProductionFromFuelCells/model_{model_run}.parquet"
+        script:
+            "calc_result_variables.py"
+else:
+    rule calc_result_variables:
+        priority: 100
+        input: "results/{scenario}/model_{model_run}/res-csv_done.txt"
+        params: "results/{scenario}/model_{model_run}/results"
+        output: 
+            "results/{scenario}/model_{model_run}/results/AnnualShareOfProduction.csv",
+            "results/{scenario}/model_{model_run}/results/ProductionFromFuelCells.csv"
+        script:
+            "calc_result_variables.py"
\ No newline at end of file
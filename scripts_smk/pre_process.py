@@ -24,6 +24,15 @@ Those steps (3 and 4) are commented out as they led to errors.
 5. All values for technology-mode combinations are added to the sets
 ``MODEperTECHNOLOGY``.
 
+Data files in the otoole format are processed in a single streaming pass: lines are
+written to the output file as they are read and the MODEx sets are appended at the end.
+With the ``csv`` format the MODEx sets are computed directly from the csv files of a
+data package and written to a separate data file that is passed to ``glpsol`` after
+the otoole data file::
+
+    python pre_process.py csv <csv_dir> <modex_file>
+    glpsol -m <model_file> -d <datafile> -d <modex_file>
+
  In order to start a model run with a pre-processed data file, the following sets
 need to be introduced to its associated OSeMOSYS model file::
 
@@ -36,224 +45,49 @@ need to be introduced to its associated OSeMOSYS model file::
 """
 
 import pandas as pd
+import io
 import os, sys
 from collections import defaultdict
 
 
-def main(data_format, data_infile, data_outfile):
+SET_NAMES = {
+    'set YEAR': 'year',
+    'set COMMODITY': 'fuel',  # Some models use COMMODITY instead of FUEL.
+    'set FUEL': 'fuel',
+    'set TECHNOLOGY': 'tech',
+    'set STORAGE': 'storage',
+    'set MODE_OF_OPERATION': 'mode',
+    'set EMISSION': 'emission',
+}
 
-    lines = []
+PARAMS_TO_CHECK = ['OutputActivityRatio', 'InputActivityRatio', 'TechnologyToStorage', 'TechnologyFromStorage', 'EmissionActivityRatio']
 
-    with open(data_infile, 'r') as f1:
-        for line in f1:
-            if not line.startswith(('set MODEper','set MODEx', 'end;')):
-                lines.append(line)
+# Indices of the parameters that define the MODEx sets, as written by otoole
+PARAM_INDICES = {
+    'OutputActivityRatio': ['REGION', 'TECHNOLOGY', 'FUEL', 'MODE_OF_OPERATION', 'YEAR'],
+    'InputActivityRatio': ['REGION', 'TECHNOLOGY', 'FUEL', 'MODE_OF_OPERATION', 'YEAR'],
+    'EmissionActivityRatio': ['REGION', 'TECHNOLOGY', 'EMISSION', 'MODE_OF_OPERATION', 'YEAR'],
+    'TechnologyToStorage': ['REGION', 'TECHNOLOGY', 'STORAGE', 'MODE_OF_OPERATION'],
+    'TechnologyFromStorage': ['REGION', 'TECHNOLOGY', 'STORAGE', 'MODE_OF_OPERATION'],
+}
 
-    with open(data_outfile, 'w') as f2:
-        f2.writelines(lines)
+# Parameters whose entries only define the MODEx sets if positive, the others if non-zero
+POSITIVE_PARAMS = ['TechnologyToStorage', 'TechnologyFromStorage']
 
-    parsing = False
-    parsing_year = False
-    parsing_tech = False
-    parsing_fuel = False
-    parsing_mode = False
-    parsing_storage = False
-    parsing_emission = False
-
-    year_list = []
-    fuel_list = []
-    tech_list = []
-    storage_list = []
-    mode_list = []
-    emission_list = []
 
-    data_all = []
-    data_out = []
-    data_inp = []
-    output_table = []
-    storage_to = []
-    storage_from = []
-    emission_table = []
+def write_modex_sets(file_out, set_lists, data_out, data_inp, data_all, storage_to, storage_from, emission_table, data_format):
+    """Writes the MODEx set entries and the closing ``end;`` to ``file_out``
 
-    params_to_check = ['OutputActivityRatio', 'InputActivityRatio', 'TechnologyToStorage', 'TechnologyFromStorage', 'EmissionActivityRatio']
+    The combinations are passed in as collections of unique tuples, i.e. ``(fuel, tech, mode)``
+    for ``data_out``/``data_inp``, ``(tech, mode)`` for ``data_all``,
+    ``(storage, tech, mode)`` for ``storage_to``/``storage_from`` and
+    ``(emission, tech, mode)`` for ``emission_table``.
+    """
 
-    with open(data_infile, 'r') as f:
-        for line in f:
-            if parsing_year:
-                year_list += [line.strip()] if line.strip() not in ['', ';'] else []
-            if parsing_fuel:
-                fuel_list += [line.strip()] if line.strip() not in ['', ';'] else []
-            if parsing_tech:
-                tech_list += [line.strip()] if line.strip() not in ['', ';'] else []
-            if parsing_storage:
-                storage_list += [line.strip()] if line.strip() not in ['', ';'] else []
-            if parsing_mode:
-                mode_list += [line.strip()] if line.strip() not in ['', ';'] else []
-            if parsing_emission:
-                emission_list += [line.strip()] if line.strip() not in ['', ';'] else []
-
-            if line.startswith('set YEAR'):
-                if len(line.split('=')[1]) > 1:
-                    year_list = line.split(' ')[3:-1]
-                else:
-                    parsing_year = True
-            if line.startswith('set COMMODITY'):  # Extracts list of COMMODITIES from data file. Some models use FUEL instead.
-                if len(line.split('=')[1]) > 1:
-                    fuel_list = line.split(' ')[3:-1]
-                else:
-                    parsing_fuel = True
-            if line.startswith('set FUEL'):  # Extracts list of FUELS from data file. Some models use COMMODITIES instead.
-                if len(line.split('=')[1]) > 1:
-                    fuel_list = line.split(' ')[3:-1]
-                else:
-                    parsing_fuel = True
-            if line.startswith('set TECHNOLOGY'):
-                if len(line.split('=')[1]) > 1:
-                    tech_list = line.split(' ')[3:-1]
-                else:
-                    parsing_tech = True
-            if line.startswith('set STORAGE'):
-                if len(line.split('=')[1]) > 1:
-                    storage_list = line.split(' ')[3:-1]
-                else:
-                    parsing_storage = True
-            if line.startswith('set MODE_OF_OPERATION'):
-                if len(line.split('=')[1]) > 1:
-                    mode_list = line.split(' ')[3:-1]
-                else:
-                    parsing_mode = True
-            if line.startswith('set EMISSION'):
-                if len(line.split('=')[1]) > 1:
-                    emission_list = line.split(' ')[3:-1]
-                else:
-                    parsing_emission = True
-
-            if line.startswith(";"):
-                parsing_year = False
-                parsing_tech = False
-                parsing_fuel = False
-                parsing_mode = False
-                parsing_storage = False
-                parsing_emission = False
-
-    start_year = year_list[0]
-
-    if data_format == 'momani':
-        with open(data_infile, 'r') as f:
-            for line in f:
-                if line.startswith(";"):
-                    parsing = False
-                if parsing:
-                    if line.startswith('['):
-                        fuel = line.split(',')[2]
-                        tech = line.split(',')[1]
-                        emission = line.split(',')[2]
-                    elif line.startswith(start_year):
-                        years = line.rstrip(':= ;\n').split(' ')[0:]
-                        years = [i.strip(':=') for i in years]
-                    else:
-                        values = line.rstrip().split(' ')[1:]
-                        mode = line.split(' ')[0]
-
-                        if param_current == 'OutputActivityRatio':
-                            data_out.append(tuple([fuel, tech, mode]))
-                            for i in range(0, len(years)):
-                                output_table.append(tuple([tech, fuel, mode, years[i], values[i]]))
-
-                        if param_current == 'InputActivityRatio':
-                            data_inp.append(tuple([fuel, tech, mode]))
-
-                        data_all.append(tuple([tech, mode]))
-
-                        if param_current == 'TechnologyToStorage':
-                            if not line.startswith(mode_list[0]):
-                                storage = line.split(' ')[0]
-                                values = line.rstrip().split(' ')[1:]
-                                for i in range(0, len(mode_list)):
-                                    if values[i] != '0':
-                                        storage_to.append(tuple([storage, tech, mode_list[i]]))
-
-                        if param_current == 'TechnologyFromStorage':
-                            if not line.startswith(mode_list[0]):
-                                storage = line.split(' ')[0]
-                                values = line.rstrip().split(' ')[1:]
-                                for i in range(0, len(mode_list)):
-                                    if values[i] != '0':
-                                        storage_from.append(tuple([storage, tech, mode_list[i]]))
-
-                        if param_current == 'EmissionActivityRatio':
-                            emission_table.append(tuple([emission, tech, mode]))
-
-                if line.startswith(('param OutputActivityRatio', 'param InputActivityRatio', 'param TechnologyToStorage', 'param TechnologyFromStorage', 'param EmissionActivityRatio')):
-                    param_current = line.split(' ')[1]
-                    parsing = True
-
-    if data_format == 'otoole':
-        with open(data_infile, 'r') as f:
-            for line in f:
-                details = line.split(' ')
-                if line.startswith(";"):
-                    parsing = False
-                if parsing:
-                    if len(details) > 1:
-                        if param_current == 'OutputActivityRatio':
-                            tech = details[1].strip()
-                            fuel = details[2].strip()
-                            mode = details[3].strip()
-                            year = details[4].strip()
-                            value = details[5].strip()
-
-                            if float(value) != 0.0:
-                                data_out.append(tuple([fuel, tech, mode]))
-                                output_table.append(tuple([tech, fuel, mode, year, value]))
-                                data_all.append(tuple([tech, mode]))
-
-                        if param_current == 'InputActivityRatio':
-                            tech = details[1].strip()
-                            fuel = details[2].strip()
-                            mode = details[3].strip()
-                            value = details[5].strip()
-                            if float(value) != 0.0:
-                                data_inp.append(tuple([fuel, tech, mode]))
-                                data_all.append(tuple([tech, mode]))
-
-                        if param_current == 'TechnologyToStorage':
-                            tech = details[1].strip()
-                            storage = details[2].strip()
-                            mode = details[3].strip()
-                            value = details[4].strip()
-                            if float(value) > 0.0:
-                                storage_to.append(tuple([storage, tech, mode]))
-                                data_all.append(tuple([storage, mode]))
-
-                        if param_current == 'TechnologyFromStorage':
-                            tech = details[1].strip()
-                            storage = details[2].strip()
-                            mode = details[3].strip()
-                            value = details[4].strip()
-                            if float(value) > 0.0:
-                                storage_from.append(tuple([storage, tech, mode]))
-                                data_all.append(tuple([storage, mode]))
-
-                        if param_current == 'EmissionActivityRatio':
-                            tech = details[1].strip()
-                            emission = details[2].strip()
-                            mode = details[3].strip()
-                            value = details[5].strip()
-                            if float(value) != 0.0:
-                                emission_table.append(tuple([emission, tech, mode]))
-                                data_all.append(tuple([tech, mode]))
-
-                if any(param in line for param in params_to_check):
-                    param_current = details[-2]
-                    parsing = True
-
-    data_out = list(set(data_out))
-    data_inp = list(set(data_inp))
-    data_all = list(set(data_all))
-    storage_to = list(set(storage_to))
-    storage_from = list(set(storage_from))
-    emission_table = list(set(emission_table))
+    fuel_list = set_lists['fuel']
+    tech_list = set_lists['tech']
+    storage_list = set_lists['storage']
+    emission_list = set_lists['emission']
 
     dict_out = defaultdict(list)
     dict_inp = defaultdict(list)
@@ -297,33 +131,327 @@ def main(data_format, data_infile, data_outfile):
     storage_list_len = {'otoole': 0,
                         'momani': 1}
 
-    # Append lines at the end of the data file
-    with open(data_outfile, 'w') as file_out:  # 'a' to open in 'append' mode
+    file_output_function(dict_out, dict_out, fuel_list, 'set MODExTECHNOLOGYperFUELout[', '')
+    file_output_function(dict_inp, dict_inp, fuel_list, 'set MODExTECHNOLOGYperFUELin[', '')
+    file_output_function(dict_all, dict_all, tech_list, 'set MODEperTECHNOLOGY[', '*')
 
-        file_out.writelines(lines)
+    if len(storage_list) > storage_list_len[data_format]:
+        file_output_function(dict_stt, dict_stt, storage_list, 'set MODExTECHNOLOGYperSTORAGEto[', '')
+        file_output_function(dict_stf, dict_stf, storage_list, 'set MODExTECHNOLOGYperSTORAGEfrom[', '')
+
+    if len(emission_list) > 0:
+        file_output_function(dict_emi, dict_emi, emission_list, 'set MODExTECHNOLOGYperEMISSION[', '')
+
+    file_out.write('end;')
+
+
+def modex_combinations(params):
+    """Returns the unique combinations that define the MODEx sets
+
+    Arguments
+    ---------
+    params: dict
+        DataFrames holding the index columns and the ``VALUE`` column of the
+        parameters in ``PARAM_INDICES``, keyed by parameter name. Missing
+        parameters are treated as empty.
+
+    Returns
+    -------
+    tuple
+        Lists of unique tuples in order of first occurrence, in the order
+        ``data_out, data_inp, data_all, storage_to, storage_from, emission_table``
+        expected by ``write_modex_sets``.
+    """
+
+    def unique(param, columns):
+        df = params.get(param)
+        if df is None:
+            return pd.DataFrame(columns=columns)
+        return defining_rows(df, param)[columns].drop_duplicates()
+
+    output = unique('OutputActivityRatio', ['FUEL', 'TECHNOLOGY', 'MODE_OF_OPERATION'])
+    inputs = unique('InputActivityRatio', ['FUEL', 'TECHNOLOGY', 'MODE_OF_OPERATION'])
+    emission = unique('EmissionActivityRatio', ['EMISSION', 'TECHNOLOGY', 'MODE_OF_OPERATION'])
+    storage_to = unique('TechnologyToStorage', ['STORAGE', 'TECHNOLOGY', 'MODE_OF_OPERATION'])
+    storage_from = unique('TechnologyFromStorage', ['STORAGE', 'TECHNOLOGY', 'MODE_OF_OPERATION'])
+
+    # Storages are added to the technology modes like in the line based pre-processing
+    tech_modes = pd.concat([
+        output[['TECHNOLOGY', 'MODE_OF_OPERATION']],
+        inputs[['TECHNOLOGY', 'MODE_OF_OPERATION']],
+        emission[['TECHNOLOGY', 'MODE_OF_OPERATION']],
+        storage_to[['STORAGE', 'MODE_OF_OPERATION']].set_axis(['TECHNOLOGY', 'MODE_OF_OPERATION'], axis=1),
+        storage_from[['STORAGE', 'MODE_OF_OPERATION']].set_axis(['TECHNOLOGY', 'MODE_OF_OPERATION'], axis=1),
+    ]).drop_duplicates()
+
+    return tuple(list(df.itertuples(index=False, name=None))
+                 for df in (output, inputs, tech_modes, storage_to, storage_from, emission))
+
+
+def defining_rows(df, param):
+    """Returns the first row of each combination of a parameter whose value defines the MODEx sets
+
+    The combinations are the index columns without ``YEAR``, in order of first occurrence.
+    """
+
+    mask = df['VALUE'] > 0 if param in POSITIVE_PARAMS else df['VALUE'] != 0
+    return df.loc[mask].drop_duplicates([x for x in PARAM_INDICES[param] if x != 'YEAR'])
+
+
+def read_param_block(lines, param):
+    """Tokenises the data lines of an otoole ``param`` block in one call
+
+    Arguments
+    ---------
+    lines: list
+        Data lines of the block, without the header and the closing ``;``
+    param: str
+        Name of the parameter, one of ``PARAM_INDICES``
+
+    Returns
+    -------
+    pd.DataFrame
+        Index columns as strings and the ``VALUE`` column as floats
+    """
+
+    columns = PARAM_INDICES[param]
+    return pd.read_csv(io.StringIO(''.join(lines)), sep=' ', header=None,
+                       names=columns + ['VALUE'], usecols=range(len(columns) + 1),
+                       dtype={column: str for column in columns})
+
+
+def parse_set_header(line, set_lists):
+    """Reads the members of a set given on its header line into ``set_lists``
+
+    Returns the name of the set if its members follow on the next lines, else ``None``.
+    """
+
+    parsing_set = None
+    for set_header, set_name in SET_NAMES.items():
+        if line.startswith(set_header):
+            if len(line.split('=')[1]) > 1:
+                set_lists[set_name] = line.split(' ')[3:-1]
+            else:
+                parsing_set = set_name
+    return parsing_set
+
+
+def stream_otoole(data_infile, data_outfile):
+    """Pre-processes an otoole data file in a single pass
+
+    Every line is copied to ``data_outfile`` as soon as it is read, while the
+    sets and the ratio parameter blocks are collected on the way. The lines of
+    each ratio parameter block are tokenised in one call by ``read_param_block``
+    and only the rows defining the MODEx sets (``defining_rows``) are kept, so
+    memory use is bounded by the size of the largest ratio parameter block plus
+    the combinations of all blocks instead of the size of the data file. The
+    MODEx sets are appended once the end of the input is reached, with the
+    combinations in order of first occurrence.
+    """
+
+    set_lists = {name: [] for name in SET_NAMES.values()}
+    parsing_set = None
+    blocks = {}
+    block = None
+    param_current = None
+
+    with open(data_infile, 'r') as f, open(data_outfile, 'w') as file_out:
+        for line in f:
+            if not line.startswith(('set MODEper','set MODEx', 'end;')):
+                file_out.write(line)
+
+            if block is not None:
+                if line.startswith(";"):
+                    blocks[param_current] = defining_rows(read_param_block(block, param_current), param_current)
+                    block = None
+                elif ' ' in line:
+                    block.append(line)
+                continue
+
+            if parsing_set is not None:
+                value = line.strip()
+                if value not in ['', ';']:
+                    set_lists[parsing_set].append(value)
+
+            if line.startswith('set '):
+                parsing_set = parse_set_header(line, set_lists) or parsing_set
+            elif line.startswith('param') and any(param in line for param in PARAMS_TO_CHECK):
+                param_current = line.split(' ')[-2]
+                if param_current in PARAM_INDICES:
+                    block = []
+            elif line.startswith(";"):
+                parsing_set = None
+
+        data_out, data_inp, data_all, storage_to, storage_from, emission_table = modex_combinations(blocks)
+        write_modex_sets(file_out, set_lists, data_out, data_inp, data_all,
+                         storage_to, storage_from, emission_table, 'otoole')
+
+
+def read_csv_set(csv_dir, name):
+    """Returns the members of the set ``name`` of a csv data package in file order"""
+
+    filepath = os.path.join(csv_dir, name + '.csv')
+    if not os.path.exists(filepath):
+        return []
+    return pd.read_csv(filepath, dtype=str)['VALUE'].tolist()
+
+
+def read_csv_param(csv_dir, param):
+    """Returns the csv of ``param`` with the index columns read as strings, if it exists"""
+
+    filepath = os.path.join(csv_dir, param + '.csv')
+    if not os.path.exists(filepath):
+        return None
+    return pd.read_csv(filepath, dtype={column: str for column in PARAM_INDICES[param]})
+
+
+def modex_from_csv(csv_dir, data_outfile):
+    """Writes the MODEx sets of a csv data package to a separate data file
+
+    Instead of parsing the data file written by otoole, the combinations are
+    computed directly from the ``InputActivityRatio``, ``OutputActivityRatio``,
+    ``EmissionActivityRatio``, ``TechnologyToStorage`` and ``TechnologyFromStorage``
+    csv files. The written file only holds the MODEx sets and is passed to
+    ``glpsol`` as an additional data file next to the otoole data file, i.e.
+    ``glpsol -m <model> -d <datafile> -d <modex_file>``.
+    """
+
+    set_lists = {
+        'fuel': read_csv_set(csv_dir, 'FUEL') or read_csv_set(csv_dir, 'COMMODITY'),
+        'tech': read_csv_set(csv_dir, 'TECHNOLOGY'),
+        'storage': read_csv_set(csv_dir, 'STORAGE'),
+        'emission': read_csv_set(csv_dir, 'EMISSION'),
+    }
+
+    params = {}
+    for param in PARAM_INDICES:
+        df = read_csv_param(csv_dir, param)
+        if df is not None:
+            params[param] = df
+
+    data_out, data_inp, data_all, storage_to, storage_from, emission_table = modex_combinations(params)
+
+    with open(data_outfile, 'w') as file_out:
+        write_modex_sets(file_out, set_lists, data_out, data_inp, data_all,
+                         storage_to, storage_from, emission_table, 'otoole')
+
+
+def main(data_format, data_infile, data_outfile):
+
+    if data_format == 'otoole':
+        stream_otoole(data_infile, data_outfile)
+        return
+
+    # The momani format needs the YEAR and MODE_OF_OPERATION sets before the
+    # parameters can be parsed, so the data file is read several times.
+    lines = []
+
+    with open(data_infile, 'r') as f1:
+        for line in f1:
+            if not line.startswith(('set MODEper','set MODEx', 'end;')):
+                lines.append(line)
+
+    parsing = False
+    parsing_set = None
+
+    set_lists = {name: [] for name in SET_NAMES.values()}
+
+    data_all = []
+    data_out = []
+    data_inp = []
+    storage_to = []
+    storage_from = []
+    emission_table = []
+
+    with open(data_infile, 'r') as f:
+        for line in f:
+            if parsing_set is not None:
+                value = line.strip()
+                if value not in ['', ';']:
+                    set_lists[parsing_set].append(value)
 
-        file_output_function(dict_out, dict_out, fuel_list, 'set MODExTECHNOLOGYperFUELout[', '')
-        file_output_function(dict_inp, dict_inp, fuel_list, 'set MODExTECHNOLOGYperFUELin[', '')
-        file_output_function(dict_all, dict_all, tech_list, 'set MODEperTECHNOLOGY[', '*')
+            parsing_set = parse_set_header(line, set_lists) or parsing_set
+
+            if line.startswith(";"):
+                parsing_set = None
+
+    mode_list = set_lists['mode']
+    start_year = set_lists['year'][0]
+
+    with open(data_infile, 'r') as f:
+        for line in f:
+            if line.startswith(";"):
+                parsing = False
+            if parsing:
+                if line.startswith('['):
+                    fuel = line.split(',')[2]
+                    tech = line.split(',')[1]
+                    emission = line.split(',')[2]
+                elif line.startswith(start_year):
+                    years = line.rstrip(':= ;\n').split(' ')[0:]
+                    years = [i.strip(':=') for i in years]
+                else:
+                    values = line.rstrip().split(' ')[1:]
+                    mode = line.split(' ')[0]
 
-        if len(storage_list) > storage_list_len[data_format]:
-            file_output_function(dict_stt, dict_stt, storage_list, 'set MODExTECHNOLOGYperSTORAGEto[', '')
-            file_output_function(dict_stf, dict_stf, storage_list, 'set MODExTECHNOLOGYperSTORAGEfrom[', '')
+                    if param_current == 'OutputActivityRatio':
+                        data_out.append(tuple([fuel, tech, mode]))
 
-        if len(emission_list) > 0:
-            file_output_function(dict_emi, dict_emi, emission_list, 'set MODExTECHNOLOGYperEMISSION[', '')
+                    if param_current == 'InputActivityRatio':
+                        data_inp.append(tuple([fuel, tech, mode]))
+
+                    data_all.append(tuple([tech, mode]))
+
+                    if param_current == 'TechnologyToStorage':
+                        if not line.startswith(mode_list[0]):
+                            storage = line.split(' ')[0]
+                            values = line.rstrip().split(' ')[1:]
+                            for i in range(0, len(mode_list)):
+                                if values[i] != '0':
+                                    storage_to.append(tuple([storage, tech, mode_list[i]]))
+
+                    if param_current == 'TechnologyFromStorage':
+                        if not line.startswith(mode_list[0]):
+                            storage = line.split(' ')[0]
+                            values = line.rstrip().split(' ')[1:]
+                            for i in range(0, len(mode_list)):
+                                if values[i] != '0':
+                                    storage_from.append(tuple([storage, tech, mode_list[i]]))
+
+                    if param_current == 'EmissionActivityRatio':
+                        emission_table.append(tuple([emission, tech, mode]))
+
+            if line.startswith(('param OutputActivityRatio', 'param InputActivityRatio', 'param TechnologyToStorage', 'param TechnologyFromStorage', 'param EmissionActivityRatio')):
+                param_current = line.split(' ')[1]
+                parsing = True
+
+    data_out = list(set(data_out))
+    data_inp = list(set(data_inp))
+    data_all = list(set(data_all))
+    storage_to = list(set(storage_to))
+    storage_from = list(set(storage_from))
+    emission_table = list(set(emission_table))
+
+    # Append lines at the end of the data file
+    with open(data_outfile, 'w') as file_out:
+
+        file_out.writelines(lines)
 
-        file_out.write('end;')
+        write_modex_sets(file_out, set_lists, data_out, data_inp, data_all,
+                         storage_to, storage_from, emission_table, data_format)
 
 
 if __name__ == '__main__':
 
     if len(sys.argv) != 4:
-        msg = "Usage: python {} <otoole/momani> <infile> <outfile>"
+        msg = "Usage: python {} <otoole/momani/csv> <infile/csv_dir> <outfile>"
         print(msg.format(sys.argv[0]))
         sys.exit(1)
     else:
         data_format = sys.argv[1]
         data_infile = sys.argv[2]
         data_outfile = sys.argv[3]
-        main(data_format, data_infile, data_outfile)
+        if data_format == 'csv':
+            modex_from_csv(data_infile, data_outfile)
+        else:
+            main(data_format, data_infile, data_outfile)
@@ -11,16 +11,50 @@ where:
     ``config_path`` is the path to the ``config.yaml`` file containing the results mapping
     ``output_path`` is the path to the csv file written out in IAMC format
 
+To create the IAMC data of all scenarios and model runs at once, run::
+
+    python resultify.py batch <results_root> <inputs_root> <config_path> <output_path> [<processes>] [<excel_path>]
+
+where the result folders ``<results_root>/{scenario}/results_csv`` and
+``<results_root>/{scenario}/model_{n}/results`` are found in ``results_root``
+(see ``find_result_folders``), and the data of all folders is written to one
+long-format Parquet or CSV file with a scenario and a modelrun column, and to
+an Excel file in IAMC format only if ``excel_path`` is given.
+
+The units are converted once for all variables (``convert_units``), with the conversions of
+``UNIT_CONVERSIONS`` and those listed in the configuration file under ``unit_conversions``,
+which take precedence, e.g.::
+
+    unit_conversions:
+    - unit: GW
+      to: MW
+      factor: 1000
+
 """
+import numpy as np
 import pandas as pd
 import pyam
+from iam_units import registry
 from openentrance import iso_mapping
 import sys
 import os
-from typing import List, Dict, Union
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Dict, Tuple, Union
 from yaml import load, SafeLoader
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from technology_index import TechnologyIndex
+
+# unit, converted unit and factor, converted with the unit registry of pyam if the factor is None
+UNIT_CONVERSIONS = [
+    ('PJ/yr', 'EJ/yr', None),
+    ('ktCO2/yr', 'Mt CO2/yr', 0.001),
+    ('MEUR_2015/PJ', 'EUR_2020/GJ', 1.05),
+    ('kt CO2/yr', 'Mt CO2/yr', None),
+    ('M€_2015/kt CO2', 'EUR_2020/t CO2', 1050),
+]
 
 
 def read_file(filename) -> pd.DataFrame:
@@ -29,6 +63,18 @@ def read_file(filename) -> pd.DataFrame:
 
     return df
 
+def read_indexed(filename: str, cache: Dict) -> Tuple[pd.DataFrame, TechnologyIndex]:
+    """Return a copy of a file and the index of its technologies
+
+    Each file is read and indexed once and kept in ``cache``, the copy can be changed by the filters.
+    """
+    if filename not in cache:
+        df = read_file(filename)
+        index = TechnologyIndex(df['TECHNOLOGY']) if 'TECHNOLOGY' in df.columns else None
+        cache[filename] = (df, index)
+    df, index = cache[filename]
+    return df.copy(), index
+
 def filter_dual_values(df: pd.DataFrame, emission: str, region: str):
     """Return dataframe with dual value for provided emissionlimit in provided region"""
     
@@ -46,11 +92,12 @@ def filter_dual_values(df: pd.DataFrame, emission: str, region: str):
 
     return df
 
-def filter_var_cost(df: pd.DataFrame, technologies: List) -> pd.DataFrame:
-    """Return rows that match the ``technologies``
+def filter_var_cost(df: pd.DataFrame, technologies: List, index: TechnologyIndex = None) -> pd.DataFrame:
+    """Return rows that match the first of the ``technologies``
     """
-    df_extracted = df['TECHNOLOGY'].str.extract('(' + technologies[0] + ')')
-    mask = df_extracted.notna()
+    if index is None:
+        index = TechnologyIndex(df['TECHNOLOGY'])
+    mask = index.mask(technologies[0])
 
     df['REGION'] = df['TECHNOLOGY'].str[0:2]
     df = df.drop(columns=['TECHNOLOGY', 'MODE_OF_OPERATION'])
@@ -79,22 +126,16 @@ def filter_emission(df: pd.DataFrame, emission: List) -> pd.DataFrame:
 
     return df[mask]
 
-def filter_emission_tech(df: pd.DataFrame, tech: List, emission: List) -> pd.DataFrame:
+def filter_emission_tech(df: pd.DataFrame, tech: List, emission: List, index: TechnologyIndex = None) -> pd.DataFrame:
     """Return a dataframe with annual emissions or captured emissions by one or several technologies.
     """
+    if index is None:
+        index = TechnologyIndex(df['TECHNOLOGY'])
 
-    mask_emi = df.EMISSION.isin(emission)
-    df = df[mask_emi]
-
-    df_f = pd.DataFrame(columns=['REGION','TECHNOLOGY','EMISSION','YEAR','VALUE'])
-
-    dfs = []  # list to store dataframes
-    for t in range(len(tech)):
-        mask_tech = df['TECHNOLOGY'].str.extract(f'({tech[t]})', expand=False).notna()
-        df_t = df[mask_tech]
-        dfs.append(df_t)  # append the dataframe to the list
+    mask_emi = df.EMISSION.isin(emission).to_numpy()
+    positions = index.positions(tech)
 
-    df_f = pd.concat(dfs)  # concatenate all dataframes in the list
+    df_f = df.take(positions[mask_emi[positions]])
 
     df_f['REGION'] = df_f['TECHNOLOGY'].str[:2]
     df = df_f.drop(columns='TECHNOLOGY')
@@ -103,49 +144,42 @@ def filter_emission_tech(df: pd.DataFrame, tech: List, emission: List) -> pd.Dat
 
     return df
 
-def filter_capacity(df: pd.DataFrame, technologies: List) -> pd.DataFrame:
-    """Return rows that indicate the installed power generation capacity.
+def sum_by_region_year(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """Return the non-zero sums of the rows at ``positions`` by REGION and YEAR, sorted by REGION and YEAR
+
+    The values of a region and year are summed with one numpy sum in the order of ``positions``,
+    which gives the same floats as summing the masked rows of each region and year.
     """
-    df['REGION'] = df['TECHNOLOGY'].str[:2]
-    df_f = pd.DataFrame(columns=['REGION','TECHNOLOGY','YEAR','VALUE'])
-    dfs = []  # list to store dataframes
-    for t in range(len(technologies)):
-        mask_tech = df['TECHNOLOGY'].str.extract(f'({technologies[t]})', expand=False).notna()
-        df_t = df[mask_tech]
-        dfs.append(df_t)  # append the dataframe to the list
-    df_f = pd.concat(dfs)  # concatenate all dataframes in the list
-    
-    df_list = []  # list to store dataframes
-    for r in df_f["REGION"].unique():
-        for y in df_f["YEAR"].unique():
-            df_temp = pd.DataFrame({"REGION": [r], "YEAR": [y], "VALUE": [df_f.loc[(df_f["REGION"]==r)&(df_f["YEAR"]==y),["VALUE"]].sum(axis=0).VALUE]})
-            df_list.append(df_temp)  # append the dataframe to the list
+    df_f = df[['REGION', 'YEAR', 'VALUE']].take(positions)
+    groups = df_f.groupby(by=['REGION', 'YEAR'], sort=True)
+    codes = groups.ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    values = df_f['VALUE'].to_numpy(dtype=float)[order]
+    ends = np.cumsum(np.bincount(codes, minlength=groups.ngroups))
+    sums = [values[start:end].sum() for start, end in zip(np.r_[0, ends[:-1]], ends)]
 
-    df = pd.concat(df_list).sort_values(by=['REGION','YEAR'])  # concatenate all dataframes in the list
+    df = groups.size().index.to_frame(index=False)
+    df['VALUE'] = sums
 
     return df[df.VALUE != 0].reset_index(drop=True)
 
-def filter_ProdByTechAn(df: pd.DataFrame, technologies: List) -> pd.DataFrame:
-    """Return rows that indicate Primary Energy use/generation
+def filter_capacity(df: pd.DataFrame, technologies: List, index: TechnologyIndex = None) -> pd.DataFrame:
+    """Return rows that indicate the installed power generation capacity.
     """
+    if index is None:
+        index = TechnologyIndex(df['TECHNOLOGY'])
     df['REGION'] = df['TECHNOLOGY'].str[:2]
-    df_list = []  # list to store dataframes
-    for t in range(len(technologies)):
-        mask = df['TECHNOLOGY'].str.extract(f'({technologies[t]})', expand=False).notna()    
-        df_t = df[mask]
-        df_list.append(df_t)  # append the dataframe to the list
 
-    df_f = pd.concat(df_list)  # concatenate all dataframes in the list
+    return sum_by_region_year(df, index.positions(technologies))
 
-    df_list = []  # reset the list for the next loop
-    for r in df_f["REGION"].unique():
-        for y in df_f["YEAR"].unique():
-            df_temp = pd.DataFrame({"REGION": [r], "YEAR": [y], "VALUE": [df_f.loc[(df_f["REGION"]==r)&(df_f["YEAR"]==y),["VALUE"]].sum(axis=0).VALUE]})
-            df_list.append(df_temp)  # append the dataframe to the list
-
-    df = pd.concat(df_list).sort_values(by=['REGION','YEAR'])  # concatenate all dataframes in the list
+def filter_ProdByTechAn(df: pd.DataFrame, technologies: List, index: TechnologyIndex = None) -> pd.DataFrame:
+    """Return rows that indicate Primary Energy use/generation
+    """
+    if index is None:
+        index = TechnologyIndex(df['TECHNOLOGY'])
+    df['REGION'] = df['TECHNOLOGY'].str[:2]
 
-    return df[df.VALUE != 0].reset_index(drop=True)
+    return sum_by_region_year(df, index.positions(technologies))
 
 def filter_final_energy(df: pd.DataFrame, fuels: List) -> pd.DataFrame:
     """Return dataframe that indicate the final energy demand/use per country and year.
@@ -157,85 +191,42 @@ def filter_final_energy(df: pd.DataFrame, fuels: List) -> pd.DataFrame:
 
     df['REGION'] = df['FUEL'].str[:2]
     df['FUEL'] = df['FUEL'].str[2:]
-    df_f = pd.DataFrame(columns=['REGION','TIMESLICE','FUEL','YEAR','VALUE'])
 
-    dfs = []  # list to store dataframes
-    for f in range(len(fuels)):
-        mask = df['FUEL'].str.contains(fuels[f])
-        df_t = df[mask]
-        dfs.append(df_t)  # append the dataframe to the list
+    return sum_by_region_year(df, TechnologyIndex(df['FUEL']).positions(fuels))
 
-    df_f = pd.concat(dfs)  # concatenate all dataframes in the list
-
-    df_list = []  # list to store dataframes
-    for r in df_f['REGION'].unique():
-        for y in df_f['YEAR'].unique():
-            df_temp = pd.DataFrame({"REGION": [r], "YEAR": [y], "VALUE": [df_f.loc[(df_f["REGION"]==r)&(df_f["YEAR"]==y),["VALUE"]].sum(axis=0).VALUE]})
-            df_list.append(df_temp)  # append the dataframe to the list
-
-    df = pd.concat(df_list).sort_values(by=['REGION','YEAR'])  # concatenate all dataframes in the list
-
-    return df[df.VALUE != 0].reset_index(drop=True)
-
-def calculate_trade(results: dict, techs: List) -> pd.DataFrame:
+def calculate_trade(results: dict, techs: List, indexes: Dict[str, TechnologyIndex] = None) -> pd.DataFrame:
     """Return dataframe with the net exports of a commodity
-    """
 
-    countries_list = []  # list to store dataframes for countries
-    years_list = []  # list to store dataframes for years
+    The net exports of a country and year are its use (``UseByTechnology``) minus its production
+    (``ProductionByTechnologyAnnual``) by the trade technologies, a missing use or production
+    counts as zero. The rows are ordered by country, then by year, each in the order in which
+    they first appear in the use, then in the production.
+    """
+    indexes = indexes or {}
+    aggregated = {}
     for p in results:
         df = results[p]
-        dfs = []  # list to store dataframes for each technology
-        for t in techs:
-            mask = df['TECHNOLOGY'].str.extract(f'({t})', expand=False).notna()
-            df_t = df[mask]
-            dfs.append(df_t)  # append the dataframe to the list
-
-        df_f = pd.concat(dfs)  # concatenate all dataframes in the list
-
-        df_f['REGION'] = df_f['FUEL'].str[:2]
-        df_f = df_f.drop(columns='FUEL')
-        df_f = df_f.groupby(by=['REGION', 'YEAR']).sum()
-        df_f = df_f.reset_index(level=['REGION', 'YEAR'])
+        index = indexes.get(p) or TechnologyIndex(df['TECHNOLOGY'])
+        df_f = df.take(index.positions(techs))
+        df_f = df_f.assign(REGION=df_f['FUEL'].str[:2])
+        aggregated[p] = df_f.groupby(by=['REGION', 'YEAR'])['VALUE'].sum().reset_index()
 
-        countries_list.append(df_f['REGION'])  # append the series to the list
-        years_list.append(df_f['YEAR'])  # append the series to the list
-        results[p] = df_f
-
-    countries = pd.concat(countries_list, ignore_index=True).unique()
-    years = pd.concat(years_list, ignore_index=True).unique()
-    
-    exports = results['UseByTechnology']
-    imports = results['ProductionByTechnologyAnnual']
-
-    df_list = []  # list to store dataframes
-    for country in countries:
-        for year in years:
-            if not exports[(exports['REGION']==country)&(exports['YEAR']==year)].empty:
-                if not imports[(imports['REGION']==country)&(imports['YEAR']==year)].empty:
-                    value = exports[(exports['REGION']==country)&(exports['YEAR']==year)].iloc[0]['VALUE']-imports[(imports['REGION']==country)&(imports['YEAR']==year)].iloc[0]['VALUE']
-                    df_temp = pd.DataFrame({'REGION': [country], 'YEAR': [year], 'VALUE': [value]})
-                    df_list.append(df_temp)  # append the dataframe to the list
-                else:
-                    value = exports[(exports['REGION']==country)&(exports['YEAR']==year)].iloc[0]['VALUE']
-                    df_temp = pd.DataFrame({'REGION': [country], 'YEAR': [year], 'VALUE': [value]})
-                    df_list.append(df_temp)  # append the dataframe to the list
-            else:
-                if not imports[(imports['REGION']==country)&(imports['YEAR']==year)].empty:
-                    value = -imports[(imports['REGION']==country)&(imports['YEAR']==year)].iloc[0]['VALUE']
-                    df_temp = pd.DataFrame({'REGION': [country], 'YEAR': [year], 'VALUE': [value]})
-                    df_list.append(df_temp)  # append the dataframe to the list
+    exports = aggregated['UseByTechnology']
+    imports = aggregated['ProductionByTechnologyAnnual']
 
-    if df_list:  # check if df_list is not empty
-        df = pd.concat(df_list, ignore_index=True)  # concatenate all dataframes in the list
-    else:
-        df = pd.DataFrame(columns=['REGION', 'YEAR'])  # create an empty dataframe with 'REGION' and 'YEAR' columns
+    df = exports.merge(imports, on=['REGION', 'YEAR'], how='outer', suffixes=('_exp', '_imp'), sort=False)
+    if df.empty:
         print("No trade data for the selected technologies.")
+        return pd.DataFrame(columns=['REGION', 'YEAR'])
 
-    return df
+    # a missing production is subtracted as zero, a missing use gives the negative production
+    df['VALUE'] = np.where(df['VALUE_exp'].isna(), -df['VALUE_imp'], df['VALUE_exp'] - df['VALUE_imp'].fillna(0))
 
+    countries = pd.Index(pd.concat([exports['REGION'], imports['REGION']], ignore_index=True).unique())
+    years = pd.Index(pd.concat([exports['YEAR'], imports['YEAR']], ignore_index=True).unique())
+    order = np.lexsort((years.get_indexer(df['YEAR']), countries.get_indexer(df['REGION'])))
 
-    return df
+    return df[['REGION', 'YEAR', 'VALUE']].take(order).reset_index(drop=True)
 
 def extract_results(df: pd.DataFrame, technologies: List) -> pd.DataFrame:
     """Return rows which match ``technologies``
@@ -272,11 +263,25 @@ def make_iamc(data: pd.DataFrame,
     iam_unit: str
         The unit to insert into the IAMC dataframe
 
+    """
+    iamc = pyam.IamDataFrame(make_iamc_data(data, iam_model, iam_scenario, iam_variable, iam_unit))
+    return iamc
+
+def make_iamc_data(data: pd.DataFrame,
+                   iam_model: str,
+                   iam_scenario: str,
+                   iam_variable: str,
+                   iam_unit: str
+                   ) -> pd.DataFrame:
+    """Creates the rows of an IAM Dataframe in long format from raw data
+
+    Same arguments as ``make_iamc``, only the region, year and value of ``data`` are kept.
     """
     data = data.reset_index()
-    data = data.rename(columns={
+    data = data[['REGION', 'YEAR', 'VALUE']].rename(columns={
         'REGION': 'region',
-        'YEAR': 'year'
+        'YEAR': 'year',
+        'VALUE': 'value'
     })
     # Add required columns
     data['model'] = iam_model
@@ -284,8 +289,33 @@ def make_iamc(data: pd.DataFrame,
     data['variable'] = iam_variable
     data['unit'] = iam_unit
 
-    iamc = pyam.IamDataFrame(data)
-    return iamc
+    return data[['model', 'scenario', 'region', 'variable', 'unit', 'year', 'value']]
+
+def convert_units(data: pd.DataFrame, conversions: List[Tuple]) -> pd.DataFrame:
+    """Converts the units of IAMC data in long format with one multiplication
+
+    Arguments
+    ---------
+    data: pd.DataFrame
+        Contains the unit and value columns
+    conversions: List[Tuple]
+        Unit, converted unit and factor, the first conversion of a unit is used. Without a
+        factor, the factor is taken from the unit registry of pyam, like ``IamDataFrame.convert_unit``
+    """
+    factors = {}
+    for current, to, factor in conversions:
+        if current in factors:
+            continue
+        if factor is None:
+            factor = registry.Quantity(1.0, current.replace('-equiv', '')).to(to.replace('-equiv', '')).magnitude
+        factors[current] = (to, factor)
+
+    data = data.copy()
+    converted = data['unit'].isin(list(factors)).to_numpy()
+    units = data.loc[converted, 'unit']
+    data.loc[converted, 'value'] = data.loc[converted, 'value'] * units.map({x: y[1] for x, y in factors.items()})
+    data.loc[converted, 'unit'] = units.map({x: y[0] for x, y in factors.items()})
+    return data
 
 def load_config(filepath: str) -> Dict:
     """Reads the configuration file
@@ -366,39 +396,46 @@ def make_plots(df, model: str, scenario: str, regions: list):
 
 
 
-def main(config: Dict) -> pyam.IamDataFrame:
-    """Create the IAM data frame from results
+def extract_iamc(config: Dict, inputs_path: str, results_path: str) -> pd.DataFrame:
+    """Create the IAMC data of a folder of results in long format
 
     Loops over each entry in the configuration file, extracts the data from
-    the relevant result file and puts this into the IAMC data format
+    the relevant result file and puts this into the IAMC data format. Each
+    file is read once for all entries, the rows of all entries are converted
+    to the IAMC units at once.
 
     Arguments
     ---------
     config : dict
         The configuration dictionary
+    inputs_path : str
+        The folder of CSV files holding the OSeMOSYS inputs
+    results_path : str
+        The folder of CSV files holding the OSeMOSYS results
     """
     blob = []
+    files = {}  # files read and indexed once for all entries
     for input in config['inputs']:
 
         inpathname = os.path.join(inputs_path, input['osemosys_param'] + '.csv')
-        inputs = read_file(inpathname)
+        inputs, index = read_indexed(inpathname, files)
 
         unit = input['unit']
 
         technologies = input['variable_cost']
-        data = filter_var_cost(inputs, technologies)
+        data = filter_var_cost(inputs, technologies, index)
 
         aggregated = aggregate(data)
 
         if not aggregated.empty:
-            iamc = make_iamc(aggregated, config['model'], config['scenario'], input['iamc_variable'], unit)
+            iamc = make_iamc_data(aggregated, config['model'], config['scenario'], input['iamc_variable'], unit)
             blob.append(iamc)
 
     for result in config['results']:
 
         if type(result['osemosys_param']) == str:
             inpathname = os.path.join(results_path, result['osemosys_param'] + '.csv')
-            results = read_file(inpathname)
+            results, index = read_indexed(inpathname, files)
 
             try:
                 technologies = result['technology']
@@ -414,19 +451,19 @@ def main(config: Dict) -> pyam.IamDataFrame:
             elif 'tech_emi' in result.keys():
                 emission = result['emissions']
                 technologies = result['tech_emi']
-                data = filter_emission_tech(results, technologies, emission)
+                data = filter_emission_tech(results, technologies, emission, index)
             elif 'capacity' in result.keys():
                 technologies = result['capacity']
-                data = filter_capacity(results, technologies)
+                data = filter_capacity(results, technologies, index)
             elif 'primary_technology' in result.keys():
                 technologies = result['primary_technology']
-                data = filter_ProdByTechAn(results, technologies)
+                data = filter_ProdByTechAn(results, technologies, index)
             elif 'excluded_prod_tech' in result.keys():
                 technologies = result['excluded_prod_tech']
-                data = filter_ProdByTechAn(results, technologies)
+                data = filter_ProdByTechAn(results, technologies, index)
             elif 'el_prod_technology' in result.keys():
                 technologies = result['el_prod_technology']
-                data = filter_ProdByTechAn(results, technologies)
+                data = filter_ProdByTechAn(results, technologies, index)
             elif 'demand' in result.keys():
                 demands = result['demand']
                 data = filter_final_energy(results, demands)
@@ -439,40 +476,152 @@ def main(config: Dict) -> pyam.IamDataFrame:
 
         else:
             results = {}
+            indexes = {}
             for p in result['osemosys_param']:
                 inpathname = os.path.join(results_path, p + '.csv')
-                results[p] = read_file(inpathname)
+                results[p], indexes[p] = read_indexed(inpathname, files)
             if 'trade_tech' in result.keys():
                 technologies = result['trade_tech']
-                data = calculate_trade(results, technologies)
+                data = calculate_trade(results, technologies, indexes)
 
         aggregated = aggregate(data)
 
         if not aggregated.empty:
-            iamc = make_iamc(aggregated, config['model'], config['scenario'], result['iamc_variable'], unit)
+            iamc = make_iamc_data(aggregated, config['model'], config['scenario'], result['iamc_variable'], unit)
             blob.append(iamc)
 
-    all_data = pyam.concat(blob)
+    all_data = pd.concat(blob, ignore_index=True)
+
+    conversions = [(x['unit'], x['to'], x.get('factor')) for x in config.get('unit_conversions', [])]
+    all_data = convert_units(all_data, conversions + UNIT_CONVERSIONS)
+    all_data['region'] = all_data['region'].map(iso_mapping)
+    return all_data
+
+def main(config: Dict) -> pyam.IamDataFrame:
+    """Create the IAM data frame from results
+
+    The IAM data frame is created once from the data of all entries in the
+    configuration file (``extract_iamc``).
+
+    Arguments
+    ---------
+    config : dict
+        The configuration dictionary
+    """
+    all_data = extract_iamc(config, inputs_path, results_path)
 
-    all_data = all_data.convert_unit('PJ/yr', to='EJ/yr').timeseries()
-    all_data = pyam.IamDataFrame(all_data)
-    all_data = all_data.convert_unit('ktCO2/yr', to='Mt CO2/yr', factor=0.001).timeseries()
-    all_data = pyam.IamDataFrame(all_data)
-    all_data = all_data.convert_unit('MEUR_2015/PJ', to='EUR_2020/GJ', factor=1.05).timeseries()
-    all_data = pyam.IamDataFrame(all_data)
-    all_data = all_data.convert_unit('kt CO2/yr', to='Mt CO2/yr').timeseries()
-    all_data.index = all_data.index.set_levels(all_data.index.levels[2].map(iso_mapping), level=2)
-    all_data = pyam.IamDataFrame(all_data)
-    all_data = all_data.convert_unit('M€_2015/kt CO2', to='EUR_2020/t CO2', factor=1050).timeseries()
     all_data = pyam.IamDataFrame(all_data)
     return all_data
 
+def find_result_folders(results_root: str, inputs_root: str) -> List[Dict]:
+    """Return the result folders of all scenarios and model runs
+
+    The result folders are found in two layouts:
+
+    - ``<results_root>/{scenario}/results_csv`` of a scenario run, with the inputs
+      in ``<inputs_root>/{scenario}/data``
+    - ``<results_root>/{scenario}/model_{n}/results`` of a model run of the GSA,
+      with the inputs in ``<results_root>/{scenario}/model_{n}/data``
+
+    Arguments
+    ---------
+    results_root : str
+        The folder holding the results of the scenarios, e.g. ``results``
+    inputs_root : str
+        The folder holding the inputs of the scenario runs, e.g. ``input_data``
+    """
+    folders = []
+    for scenario in sorted(os.listdir(results_root)):
+        scenario_path = os.path.join(results_root, scenario)
+        if not os.path.isdir(scenario_path):
+            continue
+        if os.path.isdir(os.path.join(scenario_path, 'results_csv')):
+            folders.append({'scenario': scenario, 'modelrun': None,
+                            'inputs_path': os.path.join(inputs_root, scenario, 'data'),
+                            'results_path': os.path.join(scenario_path, 'results_csv')})
+        model_runs = [x for x in os.listdir(scenario_path)
+                      if re.fullmatch(r'model_\d+', x) and os.path.isdir(os.path.join(scenario_path, x, 'results'))]
+        for model_run in sorted(model_runs, key=lambda x: int(x.split('_')[1])):
+            folders.append({'scenario': scenario, 'modelrun': model_run,
+                            'inputs_path': os.path.join(scenario_path, model_run, 'data'),
+                            'results_path': os.path.join(scenario_path, model_run, 'results')})
+    return folders
+
+def extract_folder(config: Dict, folder: Dict) -> Union[pd.DataFrame, None]:
+    """Return the IAMC data of a result folder with its scenario and model run, None if it fails
+    """
+    try:
+        data = extract_iamc(config, folder['inputs_path'], folder['results_path'])
+    except Exception as ex:
+        print(f"Skipping {folder['results_path']}: {ex}")
+        return None
+    data['scenario'] = folder['scenario']
+    data.insert(data.columns.get_loc('scenario') + 1, 'modelrun', folder['modelrun'])
+    return data
+
+def main_batch(config: Dict, folders: List[Dict], output_path: str, excel_path: str = None,
+               processes: int = 1) -> pd.DataFrame:
+    """Create the IAMC data of many result folders and write it once in long format
+
+    The folders are processed by ``processes`` worker processes, each result file
+    of a folder is read once for all entries in the configuration file. The data
+    of all folders is written to one Parquet or CSV file (by the extension of
+    ``output_path``) with the scenario of the folder in the scenario column and
+    the model run in the modelrun column. An Excel file in IAMC format is only
+    written if ``excel_path`` is given.
+
+    Arguments
+    ---------
+    config : dict
+        The configuration dictionary
+    folders : list
+        The result folders, see ``find_result_folders``
+    output_path : str
+        The path to the Parquet or CSV file
+    excel_path : str, optional
+        The path to the Excel file
+    processes : int, default=1
+        The number of worker processes
+    """
+    if processes > 1 and len(folders) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(extract_folder, repeat(config), folders))
+    else:
+        results = [extract_folder(config, folder) for folder in folders]
+
+    results = [x for x in results if x is not None]
+    if not results:
+        raise ValueError(f"No IAMC data could be created from {len(folders)} result folders")
+    all_data = pd.concat(results, ignore_index=True)
+    print(f"IAMC data of {len(results)} of {len(folders)} result folders")
+
+    if os.path.splitext(output_path)[1] == '.parquet':
+        all_data.to_parquet(output_path, index=False)
+    else:
+        all_data.to_csv(output_path, index=False)
+
+    if excel_path:
+        iamc = all_data.fillna({'modelrun': ''}) if all_data['modelrun'].notna().any() else all_data.drop(columns='modelrun')
+        pyam.IamDataFrame(iamc).to_excel(excel_path, sheet_name='data')
+    return all_data
+
 if __name__ == "__main__":
 
     args = sys.argv[1:]
 
+    if len(args) in (5, 6, 7) and args[0] == 'batch':
+        results_root, inputs_root, configpath, outpath = args[1:5]
+        processes = int(args[5]) if len(args) > 5 else 1
+        excel_path = args[6] if len(args) > 6 else None
+
+        config = load_config(configpath)
+        folders = find_result_folders(results_root, inputs_root)
+        main_batch(config, folders, outpath, excel_path, processes)
+        exit(0)
+
     if len(args) != 4:
         print("Usage: python resultify.py <inputs_path> <results_path> <config_path> <output_path>")
+        print("       python resultify.py batch <results_root> <inputs_root> <config_path> <output_path> [<processes>] [<excel_path>]")
         exit(1)
 
     inputs_path = args[0]
@@ -1,8 +1,17 @@
 def get_input(wildcards):
     input_file = RESULTS.set_index('filename').loc[wildcards.result_file]['resultfile']
+    if config.get('results_store', False):
+        return ["results/{wildcards.scenario}/store/{input_file}/model_{modelrun}.parquet".format(
+            modelrun=x, input_file=input_file, wildcards=wildcards) for x in MODELRUNS]
     return ["results/{wildcards.scenario}/model_{modelrun}/results/{input_file}.csv".format(
         modelrun=x, input_file=input_file, wildcards=wildcards) for x in MODELRUNS]
 
+# the extracted results are kept in the results store as well when it is used
+if config.get('results_store', False):
+    EXTRACTED_RESULT = "results/{scenario}/store/{result_file}.parquet"
+else:
+    EXTRACTED_RESULT = "results/{scenario}/{result_file}." + config['filetype']
+
 def get_sample_name(wildcards):
     if config['scale']:
         return f"modelruns/{wildcards.scenario}/morris_sample_scaled.txt"
@@ -14,17 +23,50 @@ def get_indices(wildcards):
     return {x:str(indices[x]).split(',') for x in indices}
 
 
-rule extract_results: #write results which are to analyse into seperate csv files
-    input: 
-        csvs=get_input,
-        config=config_from_scenario
-    params:
-        parameter = get_indices,
-        folder=directory("results/{{scenario}}_summary/")
-    log: "log/extract_results/extract_scenarion_{scenario}_{result_file}.log"
-    output: expand("results/{{scenario}}/{{result_file}}.{ext}", ext=config['filetype'])
-    conda: "../envs/otoole_env.yaml"
-    script: "gsa/extract_results.py"
+def get_all_inputs(wildcards):
+    inputs = []
+    for input_file in sorted(RESULTS['resultfile'].unique()):
+        if config.get('results_store', False):
+            inputs += ["results/{wildcards.scenario}/store/{input_file}/model_{modelrun}.parquet".format(
+                modelrun=x, input_file=input_file, wildcards=wildcards) for x in MODELRUNS]
+        else:
+            inputs += ["results/{wildcards.scenario}/model_{modelrun}/results/{input_file}.csv".format(
+                modelrun=x, input_file=input_file, wildcards=wildcards) for x in MODELRUNS]
+    return inputs
+
+def get_targets(wildcards):
+    targets = {}
+    for result_file, input_file in zip(RESULTS['filename'], RESULTS['resultfile']):
+        indices = RESULTS.set_index('filename').loc[result_file].dropna().drop('resultfile').to_dict()
+        targets[result_file] = (input_file, {x:str(indices[x]).split(',') for x in indices})
+    return targets
+
+
+if config.get('extract_all_results', False): # all results of config/results.csv in one job, each result file of a model run is read once
+    rule extract_all_results:
+        input: 
+            csvs=get_all_inputs,
+            config=config_from_scenario
+        params:
+            targets = get_targets
+        log: "log/extract_results/extract_scenarion_{scenario}_all.log"
+        output: expand(EXTRACTED_RESULT, result_file=RESULT_FILES, allow_missing=True)
+        threads: config.get('extract_processes', 1) #processes reading the result files of the model runs
+        conda: "../envs/otoole_env.yaml"
+        script: "gsa/extract_results.py"
+else:
+    rule extract_results: #write results which are to analyse into seperate csv files
+        input: 
+            csvs=get_input,
+            config=config_from_scenario
+        params:
+            parameter = get_indices,
+            folder=directory("results/{{scenario}}_summary/")
+        log: "log/extract_results/extract_scenarion_{scenario}_{result_file}.log"
+        output: EXTRACTED_RESULT
+        threads: config.get('extract_processes', 1) #processes reading the result files of the model runs
+        conda: "../envs/otoole_env.yaml"
+        script: "gsa/extract_results.py"
 
 # rule calculate_hourly_demand:
 #     input: expand("results/annual_demand.{ext}", ext=config['filetype'])
@@ -62,7 +104,7 @@ rule calculate_SA_user_defined:
         scaled = config['scale']
     input: 
         sample = get_sample_name,
-        results=expand("results/{{scenario}}/{{result_file}}.{ext}", ext=config['filetype'])
+        results=EXTRACTED_RESULT
     output:
         expand("results/{{scenario}}_summary/SA_{{result_file}}.{ext}",ext=['csv','png'])
     conda: "../envs/sample_env.yaml"
@@ -76,7 +118,7 @@ rule create_heatmap:
         scaled = config['scale']
     input:
         sample="modelruns/{scenario}/morris_sample.txt",
-        results=expand("results/{{scenario}}/{{result_file}}.{ext}", ext=config['filetype'])
+        results=EXTRACTED_RESULT
     output:
         "results/{scenario}_summary/{result_file}_heatmap.png"
     conda: "../envs/heatmap_env.yaml"
@@ -1,67 +1,121 @@
 """From OSEMBE
 This script runs OSeMOSYS models using gurobi. It takes as input an lp-file and produces a sol-file.
+The lp-file may be compressed (e.g. model.lp.gz), gurobi decompresses it while reading.
+
+With warm starts, the basis of the previous model run of a Morris trajectory is used as a starting point.
+The runs of a trajectory only differ in the values of one parameter group, so their lp-files have the same
+variables and constraints. This is checked with a signature (sizes and a hash of the names) written next to
+the basis, if it doesn't match or the warm started solve fails, the model is solved from scratch with barrier.
 """
+import hashlib
+import json
 import sys
 import os
 import gurobipy as gp
+from gurobipy import GRB
 import pandas as pd
 
-#CONSTRAINTS = ['Constr E8_AnnualEmissionsLimit']
+# name prefixes of the constraints whose dual values are written, e.g. ['E8_AnnualEmissionsLimit']
+#CONSTRAINTS = ['E8_AnnualEmissionsLimit']
 CONSTRAINTS = []
 
-def sol_gurobi(lp_path: str, environment, log_path: str, threads: int):
+def sol_gurobi(lp_path: str, environment, log_path: str, threads: int, basis_path: str = None,
+               signature_path: str = None):
     m = gp.read(lp_path, environment)
     m.Params.LogToConsole = 0  # don't send log to console
     m.Params.Method = 2  # 2 = barrier
     m.Params.Threads = threads  # limit solve to use max {threads}
     m.Params.NumericFocus = 0  # 0 = automatic; 3 = slow and careful
     m.Params.LogFile = log_path  # don't write log to file
+
+    if basis_path and read_warm_start(m, basis_path, signature_path):
+        m.Params.Method = 5  # 5 = deterministic concurrent simplex, starts from the basis
+        m.optimize()
+        if m.Status == GRB.OPTIMAL:
+            return m
+        print(f"Warm started solve ended with status {m.Status}, solving from scratch")
+        m.reset(1)  # 1 = also discard the basis
+        m.Params.Method = 2
+
     m.optimize()
 
     return m
 
-def get_duals(model):
-    constraints = CONSTRAINTS
+def get_signature(model) -> dict:
+    names = hashlib.sha256()
+    names.update("\n".join(model.getAttr('VarName', model.getVars())).encode())
+    names.update("\n".join(model.getAttr('ConstrName', model.getConstrs())).encode())
+    return {'NumVars': model.NumVars, 'NumConstrs': model.NumConstrs, 'names': names.hexdigest()}
+
+def read_warm_start(model, basis_path: str, signature_path: str) -> bool:
+    try:
+        with open(signature_path, 'r') as f:
+            signature = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading the signature of the basis: {e}")
+        return False
+
+    if not signature.get('basis'):
+        print("No basis of the previous model run, solving from scratch")
+        return False
+    if signature['model'] != get_signature(model):
+        print("The structure of the model differs from the previous model run, solving from scratch")
+        return False
+
+    model.read(basis_path)
+    print(f"Warm start from {basis_path}")
+    return True
+
+def write_basis(model, basis_path: str, signature_path: str):
+    signature = {'basis': True, 'model': get_signature(model)}
+    try:
+        model.write(basis_path)
+    except gp.GurobiError as e: # no basis without crossover or an optimal solution
+        print(f"Error writing the basis: {e}")
+        signature['basis'] = False
+        open(basis_path, 'w').close()
+    with open(signature_path, 'w') as f:
+        json.dump(signature, f)
+
+def get_duals(model, prefixes: list = CONSTRAINTS) -> dict:
     dic_duals = {}
+    if not prefixes:
+        return dic_duals
+
+    # the names are read in one call, the duals only for the constraints matching a prefix
     try:
-        dual = model.Pi
-        constr = model.getConstrs()
-    except AttributeError as e:
+        constrs = model.getConstrs()
+        names = pd.Series(model.getAttr('ConstrName', constrs))
+    except (AttributeError, gp.GurobiError) as e:
         print(f"Error accessing model attributes: {e}")
         return dic_duals
 
+    selected = names.str.startswith(tuple(prefixes))
+    positions = selected.to_numpy().nonzero()[0]
     try:
-        df_dual = pd.DataFrame(data= {'info': constr, 'value': dual})
-        df_dual = df_dual.astype({'info': 'str'})
-        meta = df_dual['info'].str.split('.', expand=True)
-        meta = meta[1].str.split('(', expand=True)
-        df_dual['constraint'] = meta[0]
-        df_dual['sets'] = meta[1].str[:-2]
-        df_dual = df_dual.drop(columns=['info'])
-    except Exception as e:
-        print(f"Error processing DataFrame: {e}")
+        duals = model.getAttr('Pi', [constrs[x] for x in positions])
+    except (AttributeError, gp.GurobiError) as e:
+        print(f"Error accessing model attributes: {e}")
         return dic_duals
 
-    if not df_dual.empty:
-        for c in constraints:
-            dic_duals[c] = df_dual[df_dual['constraint']==c]
-            if not dic_duals[c].empty:
-                try:
-                    sets = dic_duals[c]['sets'].str.split(',', expand=True).add_prefix('set_')
-                    dic_duals[c] = pd.concat([dic_duals[c], sets], axis=1)
-                    dic_duals[c] = dic_duals[c].drop(columns=['sets'])
-                except Exception as e:
-                    print(f"Error splitting sets: {e}")
-                    dic_duals[c] = pd.DataFrame(columns=['value', 'constraint', 'set_0', 'set_1', 'set_2'])
-            else:
-                dic_duals[c] = pd.DataFrame(columns=['value', 'constraint', 'set_0', 'set_1', 'set_2'])
+    # names are written by glpsol as <constraint>(<set>,<set>,...), or <constraint> without sets
+    meta = names[selected].str.partition('(')
+    sets = meta[2].str[:-1].where(meta[1] != '')
+    df_dual = pd.DataFrame({'value': duals, 'constraint': meta[0].to_numpy(), 'sets': sets.to_numpy()})
+
+    for c in prefixes:
+        df = df_dual[df_dual['constraint'].str.startswith(c, na=False)]
+        if df.empty:
+            dic_duals[c] = pd.DataFrame(columns=['value', 'constraint', 'set_0', 'set_1', 'set_2'])
+            continue
+        sets = df['sets'].str.split(',', expand=True).add_prefix('set_')
+        dic_duals[c] = pd.concat([df.drop(columns=['sets']), sets], axis=1).reset_index(drop=True)
     return dic_duals
 
-def write_duals(dict_duals: dict, path: str):
-    path_res = os.sep.join(path.split('/')[:-1]+['results_csv'])
-    os.mkdir(path_res)
+def write_duals(dict_duals: dict, folder: str):
+    os.makedirs(folder, exist_ok=True)
     for df in dict_duals:
-        dict_duals[df].to_csv('%(path)s/Dual_%(constr)s.csv' % {'path': path_res, 'constr': df}, index=False)
+        dict_duals[df].to_parquet('%(path)s/Dual_%(constr)s.parquet' % {'path': folder, 'constr': df}, index=False)
     return
 
 def write_sol(sol, path_out: str, path_gen: str):
@@ -89,9 +143,25 @@ if __name__ == "__main__":
     #dual_path = snakemake.output[1]
     threads = snakemake.threads
 
+    spool = snakemake.params.get('spool')
+    if spool: # solved by a running solve worker (solve_worker.py) instead
+        from solve_worker import submit, wait
+        job_id = submit(spool, {
+            'lp': lp_path, 'sol': outpath, 'log': log_path,
+            'basis': snakemake.input.get('basis'), 'signature': snakemake.input.get('signature'),
+            'basis_out': snakemake.output.get('basis'), 'signature_out': snakemake.output.get('signature'),
+            'duals': snakemake.params.get('duals'), 'dual_folder': snakemake.params.get('dual_folder')})
+        if not wait(spool, job_id):
+            sys.exit(1)
+        sys.exit(0)
+
     env = gp.Env(log_path)
 
-    model = sol_gurobi(lp_path, env, log_path, threads)
-    #dic_duals = get_duals(model)
-    #write_duals(dic_duals, dual_path)
+    model = sol_gurobi(lp_path, env, log_path, threads,
+                       snakemake.input.get('basis'), snakemake.input.get('signature'))
     write_sol(model, outpath, outpath)
+    if snakemake.params.get('duals'):
+        dic_duals = get_duals(model, snakemake.params['duals'])
+        write_duals(dic_duals, snakemake.params['dual_folder'])
+    if snakemake.output.get('basis'):
+        write_basis(model, snakemake.output['basis'], snakemake.output['signature'])
@@ -108,6 +108,18 @@ rule convert_sol:
 #     shell:
 #         "python scripts_smk/resultify.py {params.inputs_folder} {params.res_folder} {input.config_file} {output.output_file}"
 
+rule batch_to_iamc: # IAMC data of all scenario runs and model runs in results/, each result file is read once
+    input:
+        res_paths = expand("results/{scen}/res-csv_done.txt", scen = BASELINE),
+        config_file = "config/iamc_config.yaml"
+    output:
+        output_file = "results/iamc_results.parquet"
+    threads: 4
+    conda:
+        "../envs/openentrance_env.yaml"
+    shell:
+        "python scripts_smk/resultify.py batch results input_data {input.config_file} {output.output_file} {threads}"
+
 rule make_res: # doesn't work for the OSeMBE scenario -> modify config file (otoole_osembe.yaml) in python script
     message: "Creating res for {wildcards.scen}"
     input:
@@ -0,0 +1,251 @@
+"""Long-lived gurobi worker solving the LP files of a spool directory
+
+A worker creates one gurobi environment and solves the queued LP files one after the other, so the
+start-up of the interpreter and of the environment/licence is only paid once. The ``.sol`` files and
+per-run logs are written to the paths given in the job, i.e. the same layout as ``solve_lp``.
+
+The spool directory holds one JSON file per job::
+
+    <spool>/queue/    jobs waiting to be solved
+    <spool>/running/  jobs claimed by a worker
+    <spool>/done/     solved jobs
+    <spool>/failed/   jobs that raised an error, with the error message
+
+Several workers can share a spool, a job is claimed by moving it from ``queue`` to ``running``.
+After each run the worker reports the throughput in runs/hour.
+
+While a job is solved, the worker touches its file in ``running`` every ``HEARTBEAT`` seconds. A
+running job that was not touched for ``STALE_AFTER`` seconds belongs to a worker that was killed or
+lost, it is moved back to ``queue`` by the workers and by the waiting jobs, or to ``failed`` after
+``MAX_ATTEMPTS`` attempts.
+
+To start a worker, use the following::
+
+    python scripts_smk/solve_worker.py serve <spool> [<threads>] [<idle_timeout>]
+
+The worker stops after ``idle_timeout`` seconds without jobs, or runs until interrupted if not set.
+A job is submitted and waited for with::
+
+    python scripts_smk/solve_worker.py submit <spool> <lp_path> <sol_path> <log_path> [<timeout>]
+
+Waiting fails after ``timeout`` seconds, ``WAIT_TIMEOUT`` (the time limit of ``solve_lp``) if not set.
+With ``solve_worker`` set in config.yaml, the ``solve_lp`` jobs submit their LP file to the worker
+instead of solving it themselves (see run.py).
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+SUBFOLDERS = ['queue', 'running', 'done', 'failed']
+
+HEARTBEAT = 30  # seconds between the touches of a running job
+STALE_AFTER = 300  # seconds without a touch after which a running job is requeued
+MAX_ATTEMPTS = 2  # claims of a job before it is failed instead of requeued
+WAIT_TIMEOUT = 12 * 3600  # seconds, the time limit of the solve_lp rule
+
+
+def create_spool(spool: str):
+    for folder in SUBFOLDERS:
+        os.makedirs(os.path.join(spool, folder), exist_ok=True)
+
+
+def submit(spool: str, job: dict) -> str:
+    """Queues a job and returns its id
+
+    Parameters
+    ----------
+    spool : str
+        Path to the spool directory
+    job : dict
+        Paths of the job, ``lp``, ``sol`` and ``log`` are required, ``basis``, ``signature``,
+        ``basis_out`` and ``signature_out`` are used for warm starts, ``duals`` (constraint name
+        prefixes) and ``dual_folder`` for the dual values
+
+    Returns
+    -------
+    str
+        Id of the job, the name of its file in the spool directory
+    """
+    create_spool(spool)
+    job_id = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}.json"
+    job = {key: os.path.abspath(value) if isinstance(value, str) else value for key, value in job.items() if value}
+    tmp_path = os.path.join(spool, job_id + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, os.path.join(spool, 'queue', job_id))
+    return job_id
+
+
+def wait(spool: str, job_id: str, poll: float = 2, timeout: float = WAIT_TIMEOUT) -> bool:
+    """Waits for a job to finish, returns True if it was solved
+
+    Stale running jobs of the spool are requeued while waiting. Returns False if the job failed or
+    did not finish within ``timeout`` seconds.
+    """
+    start = time.perf_counter()
+    while True:
+        if os.path.exists(os.path.join(spool, 'done', job_id)):
+            return True
+        failed = os.path.join(spool, 'failed', job_id)
+        if os.path.exists(failed):
+            with open(failed, 'r') as f:
+                print(f"Solving failed: {json.load(f).get('error')}")
+            return False
+        if time.perf_counter() - start > timeout:
+            try:  # not solved later if still queued
+                os.remove(os.path.join(spool, 'queue', job_id))
+            except FileNotFoundError:
+                pass
+            print(f"Solving failed: job {job_id} did not finish within {timeout:.0f} s, is a solve worker running?")
+            return False
+        requeue_stale(spool)
+        time.sleep(poll)
+
+
+def requeue_stale(spool: str, stale_after: float = STALE_AFTER):
+    """Moves the running jobs without a heartbeat for ``stale_after`` seconds back to the queue
+
+    A job claimed ``MAX_ATTEMPTS`` times is moved to failed instead.
+    """
+    now = time.time()
+    for job_id in os.listdir(os.path.join(spool, 'running')):
+        path = os.path.join(spool, 'running', job_id)
+        try:
+            if now - os.path.getmtime(path) < stale_after:
+                continue
+            stale_path = os.path.join(spool, job_id + '.stale')
+            os.rename(path, stale_path)
+        except FileNotFoundError:  # finished or requeued by another process
+            continue
+        with open(stale_path, 'r') as f:
+            job = json.load(f)
+        if job.get('attempts', 1) >= MAX_ATTEMPTS:
+            job['error'] = f"no heartbeat of the solve worker for {stale_after:.0f} s in {job.get('attempts', 1)} attempts"
+            target = 'failed'
+        else:
+            target = 'queue'
+        with open(stale_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(stale_path, os.path.join(spool, target, job_id))
+        print(f"Moved stale job {job_id} of {job['lp']} to {target}", flush=True)
+
+
+def claim(spool: str):
+    """Moves the oldest queued job to running, returns its id and paths or None"""
+    requeue_stale(spool)
+    for job_id in sorted(os.listdir(os.path.join(spool, 'queue'))):
+        path = os.path.join(spool, 'running', job_id)
+        queued = os.path.join(spool, 'queue', job_id)
+        try:
+            os.utime(queued)  # the heartbeat starts with the claim, not with the submission
+            os.rename(queued, path)
+        except FileNotFoundError:  # claimed by another worker
+            continue
+        with open(path, 'r') as f:
+            job = json.load(f)
+        job['attempts'] = job.get('attempts', 0) + 1
+        with open(path, 'w') as f:
+            json.dump(job, f)
+        return job_id, job
+    return None
+
+
+def heartbeat(path: str, stop: threading.Event):
+    """Touches the file of a running job every ``HEARTBEAT`` seconds until ``stop`` is set"""
+    while not stop.wait(HEARTBEAT):
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # requeued as stale
+            return
+
+
+def solve(job: dict, env, threads: int):
+    from run import sol_gurobi, write_sol, write_basis, get_duals, write_duals
+
+    model = sol_gurobi(job['lp'], env, job['log'], threads, job.get('basis'), job.get('signature'))
+    write_sol(model, job['sol'], job['sol'])
+    if job.get('duals'):
+        write_duals(get_duals(model, job['duals']), job['dual_folder'])
+    if job.get('basis_out'):
+        write_basis(model, job['basis_out'], job['signature_out'])
+    model.dispose()
+
+
+def serve(spool: str, threads: int, idle_timeout: float = None, poll: float = 1):
+    """Solves the queued jobs with one gurobi environment until idle for ``idle_timeout`` seconds"""
+    import gurobipy as gp
+
+    create_spool(spool)
+    env = gp.Env(os.path.join(spool, f"worker_{os.getpid()}.log"))
+    start = time.perf_counter()
+    idle_since = time.perf_counter()
+    runs = 0
+    print(f"Solve worker {os.getpid()} waiting for jobs in {spool}")
+    try:
+        while True:
+            claimed = claim(spool)
+            if claimed is None:
+                if idle_timeout is not None and time.perf_counter() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll)
+                continue
+
+            job_id, job = claimed
+            running = os.path.join(spool, 'running', job_id)
+            stop = threading.Event()
+            beat = threading.Thread(target=heartbeat, args=(running, stop), daemon=True)
+            beat.start()
+            run_start = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(job['sol']), exist_ok=True)
+                solve(job, env, threads)
+                target = 'done'
+            except Exception as e:
+                job['error'] = str(e)
+                target = 'failed'
+            finally:
+                stop.set()
+                beat.join()
+            try:
+                if target == 'failed':
+                    with open(running, 'r+') as f:
+                        f.truncate()
+                        json.dump(job, f)
+                os.replace(running, os.path.join(spool, target, job_id))
+            except FileNotFoundError:  # requeued as stale while solving
+                print(f"Job {job_id} was moved as stale while solving", flush=True)
+
+            runs += 1
+            idle_since = time.perf_counter()
+            hours = (idle_since - start) / 3600
+            print(f"{target}: {job['lp']} in {idle_since - run_start:.1f} s, "
+                  f"{runs} runs at {runs / hours:.1f} runs/hour", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.dispose()
+
+    hours = (time.perf_counter() - start) / 3600
+    print(f"Solve worker {os.getpid()} stopped after {runs} runs ({runs / hours:.1f} runs/hour)")
+
+
+if __name__ == "__main__":
+
+    args = sys.argv[1:]
+
+    if len(args) in (2, 3, 4) and args[0] == 'serve':
+        threads = int(args[2]) if len(args) > 2 else 4
+        idle_timeout = float(args[3]) if len(args) > 3 else None
+        serve(args[1], threads, idle_timeout)
+    elif len(args) in (5, 6) and args[0] == 'submit':
+        job_id = submit(args[1], {'lp': args[2], 'sol': args[3], 'log': args[4]})
+        timeout = float(args[5]) if len(args) > 5 else WAIT_TIMEOUT
+        if not wait(args[1], job_id, timeout=timeout):
+            sys.exit(1)
+    else:
+        print("Usage: python scripts_smk/solve_worker.py serve <spool> [<threads>] [<idle_timeout>]")
+        print("       python scripts_smk/solve_worker.py submit <spool> <lp_path> <sol_path> <log_path> [<timeout>]")
+        sys.exit(1)
@@ -0,0 +1,52 @@
+"""Matches the technology codes of a result against regular expressions
+
+A ``TechnologyIndex`` is built once for a column of a result, e.g. ``TECHNOLOGY``. The patterns of
+the configuration are matched against the unique codes of the column only, and the matches of
+each pattern are cached by code. The matches are broadcast to the rows with the codes of the
+column, so a filter is a lookup instead of a regex scan of all rows.
+
+The index is used by the filters of resultify.py and by calc_share in calc_result_variables.py.
+"""
+import re
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class TechnologyIndex:
+    """Regex matches of the unique codes of a column, broadcast to its rows
+
+    A code matches a pattern if the pattern is found anywhere in the code (``re.search``), like
+    ``Series.str.contains`` or the non-missing values of ``Series.str.extract``.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Codes of the rows, e.g. ``df['TECHNOLOGY']``, missing values never match
+    """
+
+    def __init__(self, values: pd.Series):
+        self.codes, self.uniques = pd.factorize(values)
+        self._matches = {}
+
+    def match(self, pattern: str) -> np.ndarray:
+        """Return if each unique code matches ``pattern``, with a last False for the missing values"""
+        if pattern not in self._matches:
+            regex = re.compile(pattern)
+            matched = [regex.search(code) is not None for code in self.uniques]
+            self._matches[pattern] = np.array(matched + [False], dtype=bool)
+        return self._matches[pattern]
+
+    def mask(self, pattern: str) -> np.ndarray:
+        """Return if each row matches ``pattern``"""
+        return self.match(pattern)[self.codes]
+
+    def positions(self, patterns: List[str]) -> np.ndarray:
+        """Return the positions of the rows matching each of the ``patterns``
+
+        The positions are listed pattern by pattern, like concatenating the rows matching each
+        pattern, so a row matching several patterns is listed once for each of them.
+        """
+        positions = [np.flatnonzero(self.mask(pattern)) for pattern in patterns]
+        return np.concatenate(positions) if positions else np.array([], dtype=int)